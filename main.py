@@ -1,16 +1,22 @@
 import asyncio
+import functools
 import html
 import logging
 import os
 import re
+import sys
+import time
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
 from aiohttp import web
 from aiogram import Bot, Dispatcher, types
+from aiogram.bot import api
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters import Regexp, Text
 from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.dispatcher.middlewares import BaseMiddleware
 from aiogram.types import (CallbackQuery, ContentType,
                            InlineKeyboardButton, InlineKeyboardMarkup,
                            KeyboardButton, ReplyKeyboardMarkup,
@@ -42,6 +48,11 @@ WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "5000"))
 WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 
+OUTBOUND_RATE_PER_SECOND = 28
+OUTBOUND_BURST = 30
+MAX_INFLIGHT_UPDATES = 64
+BOT_CONNECTIONS_LIMIT = 50
+
 
 def now_in_timezone() -> datetime:
     """Return the current datetime converted to the configured timezone."""
@@ -57,7 +68,77 @@ if not BOT_TOKEN:
 
 logging.basicConfig(level=logging.INFO)
 
-bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
+
+class OutboundRateLimiter:
+    """Token bucket that keeps outgoing Bot API calls under the global limit."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated_at) * self._rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class ThrottledBot(Bot):
+    """Bot that paces every API call except long polling through a token bucket."""
+
+    def __init__(self, *args: Any, limiter: OutboundRateLimiter, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._limiter = limiter
+
+    async def request(
+        self,
+        method: str,
+        data: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if method != api.Methods.GET_UPDATES:
+            await self._limiter.acquire()
+        return await super().request(method, data, files, **kwargs)
+
+
+class ConcurrentDispatchMiddleware(BaseMiddleware):
+    """Caps how many updates are processed at the same time."""
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_UPDATES) -> None:
+        super().__init__()
+        self._semaphore = asyncio.Semaphore(max_inflight)
+
+    async def on_pre_process_update(self, update: types.Update, data: Dict[str, Any]) -> None:
+        await self._semaphore.acquire()
+        data["_dispatch_slot"] = True
+
+    async def on_post_process_update(
+        self, update: types.Update, results: List[Any], data: Dict[str, Any]
+    ) -> None:
+        if data.pop("_dispatch_slot", False):
+            self._semaphore.release()
+
+
+bot = ThrottledBot(
+    token=BOT_TOKEN,
+    parse_mode="HTML",
+    connections_limit=BOT_CONNECTIONS_LIMIT,
+    limiter=OutboundRateLimiter(OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST),
+)
+# Состояния FSM держим в памяти процесса: бот запускается в одном экземпляре,
+# и get_data/set_data не ходят в сеть. При переходе на несколько реплик нужен
+# RedisStorage2 на Redis без синхронного fsync (appendfsync everysec).
 fsm_storage = MemoryStorage()
 dp = Dispatcher(bot, storage=fsm_storage)
 
@@ -69,6 +150,7 @@ class DirectorStates(StatesGroup):
     position = State()
     note = State()
     confirm = State()
+    publishing = State()
 
 
 class WorkerStates(StatesGroup):
@@ -81,6 +163,7 @@ class WorkerStates(StatesGroup):
     position = State()
     note = State()
     confirm = State()
+    publishing = State()
 
 
 class RegistrationStates(StatesGroup):
@@ -146,10 +229,24 @@ DISABLED_CALLBACK_DATA = "noop"
 REQUEST_LOCKS: Dict[int, asyncio.Lock] = {}
 REQUEST_LOCKS_MAP_LOCK = asyncio.Lock()
 
+PUBLICATION_CONCURRENCY = 8
+PUBLICATION_SEMAPHORE = asyncio.Semaphore(PUBLICATION_CONCURRENCY)
+publication_tasks: Set[asyncio.Task] = set()
+TECH_ERROR_ALERTS_PER_SECOND = 3
+tech_error_tasks: Set[asyncio.Task] = set()
+SHUTDOWN_TASKS_TIMEOUT_SECONDS = 10.0
+_tech_error_window_start = 0.0
+_tech_error_count = 0
+
 SHOPS_REFRESH_INTERVAL_SECONDS = 15 * 60
 shops_refresh_task: Optional[asyncio.Task] = None
 REQUESTS_CLEANUP_INTERVAL_SECONDS = 60
 requests_cleanup_task: Optional[asyncio.Task] = None
+SHOPS_CACHE_TTL_SECONDS = 30.0
+_shops_cache: Optional[Tuple[float, Mapping[int, storage.ShopRecord]]] = None
+CONTACT_CACHE_TTL_SECONDS = 3600.0
+_contact_known: Dict[int, float] = {}
+_callback_data_cache: Dict[Tuple[str, int], str] = {}
 
 POSITION_BUTTON_OPTIONS: Tuple[str, ...] = (
     "Кассир",
@@ -233,6 +330,22 @@ WEEKDAY_ALIASES = {
 }
 
 
+_BACK_COMMAND_CASEFOLD = BACK_COMMAND.casefold()
+
+
+def _is_back_command(text: Optional[str]) -> bool:
+    return bool(text) and text.strip().casefold() == _BACK_COMMAND_CASEFOLD
+
+
+def indexed_callback_data(prefix: str, value: int) -> str:
+    key = (prefix, value)
+    callback_data = _callback_data_cache.get(key)
+    if callback_data is None:
+        callback_data = sys.intern(f"{prefix}:{value}")
+        _callback_data_cache[key] = callback_data
+    return callback_data
+
+
 def build_date_reply_keyboard() -> ReplyKeyboardMarkup:
     keyboard = ReplyKeyboardMarkup(
         resize_keyboard=True,
@@ -252,6 +365,7 @@ def build_back_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@functools.lru_cache(maxsize=2)
 def build_inline_date_keyboard(base_date: date) -> InlineKeyboardMarkup:
     markup = InlineKeyboardMarkup(row_width=3)
     for offset in range(INLINE_DATE_DAYS):
@@ -285,6 +399,19 @@ def build_position_keyboard(flow: str) -> InlineKeyboardMarkup:
     return markup
 
 
+REMOVE_KEYBOARD = ReplyKeyboardRemove()
+BACK_KEYBOARD = build_back_keyboard()
+DATE_REPLY_KEYBOARD = build_date_reply_keyboard()
+DIRECTOR_CONFIRM_KEYBOARD = InlineKeyboardMarkup().add(
+    InlineKeyboardButton("Опубликовать", callback_data="director_confirm"),
+    InlineKeyboardButton("Отмена", callback_data="director_cancel"),
+)
+WORKER_CONFIRM_KEYBOARD = InlineKeyboardMarkup().add(
+    InlineKeyboardButton("Опубликовать", callback_data="worker_confirm"),
+    InlineKeyboardButton("Отмена", callback_data="worker_cancel"),
+)
+
+
 def _canonicalize_position_key(value: str) -> str:
     text = value.strip().lower()
     text = text.replace("ё", "е")
@@ -433,7 +560,7 @@ async def proceed_to_note_step(
             "Оставьте пожелания по смене. Если нечего добавить, отправьте «—». "
             "Чтобы вернуться к выбору должности, напишите «Назад»."
         )
-    await source_message.answer(prompt, reply_markup=ReplyKeyboardRemove())
+    await source_message.answer(prompt, reply_markup=REMOVE_KEYBOARD)
 
 
 def format_human_date(value: date) -> str:
@@ -582,7 +709,7 @@ def _parse_numeric_date(parts: Tuple[str, ...], today: date) -> Optional[date]:
 
 
 TIME_RANGE_PATTERN = re.compile(
-    r"^(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?$"
+    r"(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?"
 )
 
 
@@ -675,12 +802,18 @@ def build_station_keyboard(
     for index in range(start, end):
         station = stations[index]
         button_text = f"{station.name} (лавок: {station.shop_count})"
-        markup.add(InlineKeyboardButton(button_text, callback_data=f"wstation_pick:{index}"))
+        markup.add(
+            InlineKeyboardButton(button_text, callback_data=indexed_callback_data("wstation_pick", index))
+        )
     nav_buttons: List[InlineKeyboardButton] = []
     if page > 0:
-        nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"wstation_page:{page - 1}"))
+        nav_buttons.append(
+            InlineKeyboardButton("◀️", callback_data=indexed_callback_data("wstation_page", page - 1))
+        )
     if page < total_pages - 1:
-        nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"wstation_page:{page + 1}"))
+        nav_buttons.append(
+            InlineKeyboardButton("▶️", callback_data=indexed_callback_data("wstation_page", page + 1))
+        )
     if nav_buttons:
         markup.row(*nav_buttons)
     markup.row(InlineKeyboardButton(STATION_SEARCH_BUTTON_TEXT, callback_data="wstation_search"))
@@ -698,12 +831,18 @@ def build_shop_keyboard(
     for index in range(start, end):
         entry = shops[index]
         button_text = f"🏪 {entry['name']} · {entry['distance']} м"
-        markup.add(InlineKeyboardButton(button_text, callback_data=f"wshop_pick:{index}"))
+        markup.add(
+            InlineKeyboardButton(button_text, callback_data=indexed_callback_data("wshop_pick", index))
+        )
     nav_buttons: List[InlineKeyboardButton] = []
     if page > 0:
-        nav_buttons.append(InlineKeyboardButton("◀️", callback_data=f"wshop_page:{page - 1}"))
+        nav_buttons.append(
+            InlineKeyboardButton("◀️", callback_data=indexed_callback_data("wshop_page", page - 1))
+        )
     if page < total_pages - 1:
-        nav_buttons.append(InlineKeyboardButton("▶️", callback_data=f"wshop_page:{page + 1}"))
+        nav_buttons.append(
+            InlineKeyboardButton("▶️", callback_data=indexed_callback_data("wshop_page", page + 1))
+        )
     if nav_buttons:
         markup.row(*nav_buttons)
     markup.row(InlineKeyboardButton(SHOP_BACK_BUTTON_TEXT, callback_data="wshop_back"))
@@ -726,7 +865,7 @@ def parse_time_range(raw_value: str) -> Optional[Tuple[str, str]]:
     normalized = normalized.replace(",", ":")
     normalized = normalized.replace(".", ":")
     normalized = re.sub(r"\s+", " ", normalized)
-    match = TIME_RANGE_PATTERN.match(normalized)
+    match = TIME_RANGE_PATTERN.fullmatch(normalized)
     if not match:
         return None
     start_hour, start_minute, end_hour, end_minute = match.groups()
@@ -772,13 +911,19 @@ def resolve_flow(state_name: Optional[str]) -> Optional[str]:
     return None
 
 
+async def update_state_data(state: FSMContext, **values: Any) -> Dict[str, Any]:
+    async with state.proxy() as data:
+        data.update(values)
+        return data.as_dict()
+
+
 async def start_date_step(message: types.Message, state: FSMContext, flow: str) -> None:
     state_cls = DirectorStates if flow == "director" else WorkerStates
     await state.set_state(state_cls.date.state)
     await state.set_data({})
     await message.answer(
         DATE_PROMPT_MESSAGE,
-        reply_markup=build_date_reply_keyboard(),
+        reply_markup=DATE_REPLY_KEYBOARD,
     )
     await send_inline_date_choices(message)
 
@@ -795,7 +940,7 @@ async def send_inline_date_choices(message: types.Message) -> None:
 async def prompt_time_range(message: types.Message, state: FSMContext, flow: str) -> None:
     state_cls = DirectorStates if flow == "director" else WorkerStates
     await state.set_state(state_cls.time_range.state)
-    await message.answer(TIME_PROMPT_MESSAGE, reply_markup=build_back_keyboard())
+    await message.answer(TIME_PROMPT_MESSAGE, reply_markup=BACK_KEYBOARD)
 
 
 async def apply_date_selection(
@@ -810,7 +955,7 @@ async def apply_date_selection(
     logging.debug("Пользователь выбрал дату %s (iso=%s)", date_human, date_iso)
     await message.answer(
         confirmation_text,
-        reply_markup=ReplyKeyboardRemove(),
+        reply_markup=REMOVE_KEYBOARD,
     )
     await prompt_time_range(message, state, flow)
 
@@ -826,7 +971,7 @@ async def process_date_message(message: types.Message, state: FSMContext) -> Non
         )
         await message.answer(
             DATE_PROMPT_MESSAGE,
-            reply_markup=build_date_reply_keyboard(),
+            reply_markup=DATE_REPLY_KEYBOARD,
         )
         await send_inline_date_choices(message)
         return
@@ -847,7 +992,7 @@ async def process_date_message(message: types.Message, state: FSMContext) -> Non
         await message.answer(DATE_PARSE_ERROR_MESSAGE)
         await message.answer(
             DATE_PROMPT_MESSAGE,
-            reply_markup=build_date_reply_keyboard(),
+            reply_markup=DATE_REPLY_KEYBOARD,
         )
         return
     await apply_date_selection(message, state, flow, parsed_date)
@@ -951,7 +1096,16 @@ def build_contact_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+def remember_contact(user_id: int) -> None:
+    _contact_known[user_id] = time.monotonic() + CONTACT_CACHE_TTL_SECONDS
+
+
 async def ensure_contact_exists(message: types.Message) -> bool:
+    expires_at = _contact_known.get(message.from_user.id)
+    if expires_at is not None:
+        if expires_at > time.monotonic():
+            return True
+        _contact_known.pop(message.from_user.id, None)
     user_record = await storage.gs_get_user(message.from_user.id)
     raw_phone = (user_record or {}).get("phone_number") if user_record else ""
     if isinstance(raw_phone, str):
@@ -962,6 +1116,7 @@ async def ensure_contact_exists(message: types.Message) -> bool:
         phone_number = ""
     await ensure_user(message.from_user, phone_number=phone_number or None)
     if phone_number:
+        remember_contact(message.from_user.id)
         return True
     await message.answer(
         "Для регистрации поделитесь, пожалуйста, своим контактом.",
@@ -1066,15 +1221,32 @@ async def send_tech(message: str) -> None:
         logging.exception("Не удалось отправить сообщение в тех-чат: %s", exc)
 
 
-async def fetch_shops() -> Dict[int, storage.ShopRecord]:
+async def fetch_shops() -> Mapping[int, storage.ShopRecord]:
     return storage.get_shops()
 
 
+async def get_shops_cached() -> Mapping[int, storage.ShopRecord]:
+    global _shops_cache
+    cached = _shops_cache
+    if cached is not None and time.monotonic() - cached[0] < SHOPS_CACHE_TTL_SECONDS:
+        return cached[1]
+    shops = await fetch_shops()
+    _shops_cache = (time.monotonic(), shops)
+    return shops
+
+
+def invalidate_shops_cache() -> None:
+    global _shops_cache
+    _shops_cache = None
+    build_director_shop_keyboard.cache_clear()
+
+
 async def periodic_shops_refresh() -> None:
     while True:
         try:
             await asyncio.sleep(SHOPS_REFRESH_INTERVAL_SECONDS)
             await storage.refresh_shops_cache()
+            invalidate_shops_cache()
             shops = storage.get_shops()
             logging.info(
                 "Кеш лавок обновлён автоматически. Доступно лавок: %s", len(shops)
@@ -1350,9 +1522,11 @@ async def on_callback_pick(call: CallbackQuery) -> None:
                 await call.answer(LIMIT_REACHED_MESSAGE, show_alert=True)
                 return
 
-            author_chat = await bot.get_chat(updated_record["author_id"])
-            picker_user_data = await storage.gs_get_user(picker.id)
-            author_user_data = await storage.gs_get_user(updated_record["author_id"])
+            author_chat, picker_user_data, author_user_data = await asyncio.gather(
+                bot.get_chat(updated_record["author_id"]),
+                storage.gs_get_user(picker.id),
+                storage.gs_get_user(updated_record["author_id"]),
+            )
             picker_contact = html.escape(format_contact_details(picker_user_data, picker))
             author_contact = html.escape(
                 format_contact_details(author_user_data, author_chat)
@@ -1414,41 +1588,45 @@ async def on_callback_pick(call: CallbackQuery) -> None:
                 message_for_picker = "\n".join(picker_lines)
                 message_for_author = "\n".join(author_lines)
 
-            try:
-                await bot.send_message(
-                    updated_record["author_id"],
-                    message_for_author,
-                    disable_web_page_preview=True,
-                )
-            except Exception as exc:  # noqa: BLE001
-                logging.exception(
-                    "Не удалось уведомить автора заявки %s", updated_record["author_id"]
-                )
-                await send_tech(
-                    f"Не удалось уведомить автора заявки {updated_record['author_id']}: {exc}"
-                )
+            async def notify_author() -> None:
+                try:
+                    await bot.send_message(
+                        updated_record["author_id"],
+                        message_for_author,
+                        disable_web_page_preview=True,
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    logging.exception(
+                        "Не удалось уведомить автора заявки %s", updated_record["author_id"]
+                    )
+                    await send_tech(
+                        f"Не удалось уведомить автора заявки {updated_record['author_id']}: {exc}"
+                    )
 
-            try:
-                await bot.send_message(
-                    picker.id, message_for_picker, disable_web_page_preview=True
+            async def notify_picker() -> None:
+                try:
+                    await bot.send_message(
+                        picker.id, message_for_picker, disable_web_page_preview=True
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    logging.exception("Не удалось уведомить участника %s", picker.id)
+                    await send_tech(f"Не удалось уведомить пользователя {picker.id}: {exc}")
+
+            async def refresh_channel_post() -> None:
+                updated_text = render_channel_post(updated_record)
+                updated_markup = build_request_markup(updated_record)
+                target_message_id = (
+                    call.message.message_id
+                    if call.message and call.message.message_id
+                    else updated_record.get("channel_message_id")
                 )
-            except Exception as exc:  # noqa: BLE001
-                logging.exception("Не удалось уведомить участника %s", picker.id)
-                await send_tech(f"Не удалось уведомить пользователя {picker.id}: {exc}")
-
-            updated_text = render_channel_post(updated_record)
-            updated_markup = build_request_markup(updated_record)
-            target_message_id = (
-                call.message.message_id
-                if call.message and call.message.message_id
-                else updated_record.get("channel_message_id")
-            )
-            target_chat_id = (
-                call.message.chat.id
-                if call.message and call.message.chat
-                else CHANNEL_ID
-            )
-            if target_message_id:
+                target_chat_id = (
+                    call.message.chat.id
+                    if call.message and call.message.chat
+                    else CHANNEL_ID
+                )
+                if not target_message_id:
+                    return
                 try:
                     await bot.edit_message_text(
                         updated_text,
@@ -1463,6 +1641,10 @@ async def on_callback_pick(call: CallbackQuery) -> None:
                         request_id,
                         exc,
                     )
+
+            # Автор, участник и пост в канале — разные чаты, поэтому
+            # отправляем сообщения параллельно.
+            await asyncio.gather(notify_author(), notify_picker(), refresh_channel_post())
             logging.info(
                 "Пользователь %s обновил заявку %s (%s/%s)",
                 picker.id,
@@ -1481,34 +1663,32 @@ async def on_disabled_callback(call: CallbackQuery) -> None:
     await call.answer(LIMIT_REACHED_MESSAGE, show_alert=True)
 
 
+class PublicationPersistedError(Exception):
+    """Сбой публикации после того, как заявка уже записана в таблицу."""
+
+    def __init__(self, request_id: int, posted: bool) -> None:
+        super().__init__(f"заявка {request_id} сохранена, пост в канале: {posted}")
+        self.request_id = request_id
+        self.posted = posted
+
+
 async def handle_post_publication(
     chat_id: int,
     author: types.User,
-    state: FSMContext,
+    data: Dict[str, Any],
     kind: str,
 ) -> None:
-    data = await state.get_data()
     shop_id = data.get("shop_id")
     shop_name = data.get("shop_name")
     position_value = (data.get("position") or "").strip()
-    shops = await fetch_shops()
-    if not position_value:
-        state_cls = DirectorStates if kind == "director" else WorkerStates
-        await state.set_state(state_cls.position.state)
-        prompt_text = build_position_prompt(kind, reminder="Это обязательное поле.")
-        markup = build_position_keyboard(kind)
-        sent = await bot.send_message(chat_id, prompt_text, reply_markup=markup)
-        await state.update_data(
-            position_prompt={"chat_id": sent.chat.id if sent.chat else chat_id, "message_id": sent.message_id}
-        )
-        return
+    shops = await get_shops_cached()
     if shop_id is not None:
         if shop_id not in shops:
             await bot.send_message(
                 chat_id,
                 "Не удалось определить лавку. Попробуйте начать заново.",
+                reply_markup=build_start_keyboard(),
             )
-            await state.finish()
             return
         shop_name = shops[shop_id].name
     elif not shop_name:
@@ -1553,35 +1733,127 @@ async def handle_post_publication(
     payload["created_at"] = now_iso
     payload["updated_at"] = now_iso
     request_id, _ = await storage.gs_append_request(payload)
-    payload["id"] = request_id
-    text = render_channel_post(payload)
-    markup = build_request_markup(payload)
-    channel_message = await bot.send_message(CHANNEL_ID, text, reply_markup=markup)
+    # Дальше заявка уже в таблице: повторная отправка черновика создала бы дубль,
+    # поэтому сбои ниже сообщают, как далеко успела пройти публикация.
+    posted = False
     try:
-        await storage.gs_update_request_status(
-            request_id, "open", channel_message_id=channel_message.message_id
+        payload["id"] = request_id
+        text = render_channel_post(payload)
+        markup = build_request_markup(payload)
+        channel_message = await bot.send_message(CHANNEL_ID, text, reply_markup=markup)
+        posted = True
+
+        async def save_channel_message_id() -> None:
+            try:
+                await storage.gs_update_request_status(
+                    request_id, "open", channel_message_id=channel_message.message_id
+                )
+            except Exception as exc:  # noqa: BLE001
+                logging.exception("Failed to update channel message id for request %s", request_id)
+                await send_tech(f"Не удалось сохранить ссылку на пост {request_id}: {exc}")
+
+        await asyncio.gather(
+            save_channel_message_id(),
+            bot.send_message(
+                chat_id,
+                "Готово! Заявка опубликована в канале: @karavaevi_bk.",
+                reply_markup=build_start_keyboard(),
+            ),
         )
-    except Exception as exc:  # noqa: BLE001
-        logging.exception("Failed to update channel message id for request %s", request_id)
-        await send_tech(f"Не удалось сохранить ссылку на пост {request_id}: {exc}")
-    await bot.send_message(
-        chat_id,
-        "Готово! Заявка опубликована в канале: @karavaevi_bk.",
-        reply_markup=build_start_keyboard(),
-    )
+    except Exception as exc:
+        raise PublicationPersistedError(request_id, posted) from exc
     logging.info(
         "Пользователь %s опубликовал заявку %s типа %s",
         author.id,
         request_id,
         kind,
     )
-    await state.finish()
+
+async def _run_publication(
+    chat_id: int, author: types.User, data: Dict[str, Any], kind: str
+) -> None:
+    state = dp.current_state(chat=chat_id, user=author.id)
+    states_group = DirectorStates if kind == "director" else WorkerStates
+    async with PUBLICATION_SEMAPHORE:
+        try:
+            await handle_post_publication(chat_id, author, data, kind)
+        except PublicationPersistedError as exc:
+            logging.exception(
+                "Заявка %s пользователя %s сохранена, но публикация не завершена",
+                exc.request_id,
+                author.id,
+            )
+            await send_tech(
+                f"Заявка {exc.request_id} пользователя {author.id} сохранена, "
+                f"но публикация не завершена: {exc.__cause__}"
+            )
+            if await state.get_state() != states_group.publishing.state:
+                return
+            # Черновик уже записан, повторно предлагать его отправку нельзя.
+            await state.finish()
+            if exc.posted:
+                text = "Заявка опубликована в канале: @karavaevi_bk."
+            else:
+                text = (
+                    "Заявка сохранена, но пост в канале не отправился. "
+                    "Мы уже разбираемся, отправлять её повторно не нужно."
+                )
+            try:
+                await bot.send_message(chat_id, text, reply_markup=build_start_keyboard())
+            except Exception:  # noqa: BLE001
+                logging.debug("Не удалось сообщить пользователю %s об ошибке публикации", author.id)
+            return
+        except Exception as exc:  # noqa: BLE001
+            logging.exception("Не удалось опубликовать заявку пользователя %s", author.id)
+            await send_tech(f"Не удалось опубликовать заявку пользователя {author.id}: {exc}")
+            # Пока шла публикация, пользователь мог начать новый сценарий: его не трогаем.
+            if await state.get_state() != states_group.publishing.state:
+                return
+            # Черновик остаётся в FSM: возвращаем пользователя к подтверждению.
+            await state.set_state(states_group.confirm.state)
+            keyboard = (
+                DIRECTOR_CONFIRM_KEYBOARD if kind == "director" else WORKER_CONFIRM_KEYBOARD
+            )
+            try:
+                await bot.send_message(
+                    chat_id,
+                    "Не удалось опубликовать заявку. Черновик сохранён, "
+                    "попробуйте отправить его ещё раз.",
+                    reply_markup=keyboard,
+                )
+            except Exception:  # noqa: BLE001
+                logging.debug("Не удалось сообщить пользователю %s об ошибке публикации", author.id)
+            return
+    if await state.get_state() == states_group.publishing.state:
+        await state.finish()
+
+
+def spawn_publication(
+    chat_id: int, author: types.User, data: Dict[str, Any], kind: str
+) -> None:
+    task = asyncio.create_task(_run_publication(chat_id, author, data, kind))
+    publication_tasks.add(task)
+    task.add_done_callback(publication_tasks.discard)
+
+
+@functools.lru_cache(maxsize=4)
+def build_director_shop_keyboard(shops_key: Tuple[Tuple[int, str], ...]) -> InlineKeyboardMarkup:
+    buttons = [
+        InlineKeyboardButton(
+            name, callback_data=indexed_callback_data("director_shop", shop_id)
+        )
+        for shop_id, name in sorted(shops_key, key=lambda item: item[1].lower())
+    ]
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    for index in range(0, len(buttons), 2):
+        keyboard.row(*buttons[index:index + 2])
+    return keyboard
 
 
 async def present_director_shop_menu(
     target_message: types.Message, state: FSMContext, *, via_edit: bool
 ) -> bool:
-    shops = await fetch_shops()
+    shops = await get_shops_cached()
     if not shops:
         await state.finish()
         text = (
@@ -1598,12 +1870,9 @@ async def present_director_shop_menu(
                 )
         await target_message.answer(text, reply_markup=markup)
         return False
-    keyboard = InlineKeyboardMarkup(row_width=2)
-    sorted_shops = sorted(shops.values(), key=lambda record: record.name.lower())
-    for shop in sorted_shops:
-        keyboard.insert(
-            InlineKeyboardButton(shop.name, callback_data=f"director_shop:{shop.id}")
-        )
+    keyboard = build_director_shop_keyboard(
+        tuple((shop_id, record.name) for shop_id, record in shops.items())
+    )
     await state.set_state(DirectorStates.shop.state)
     if via_edit:
         try:
@@ -1615,57 +1884,101 @@ async def present_director_shop_menu(
     return True
 
 
-def run_director_flow(dispatcher: Dispatcher) -> None:
-    @dispatcher.message_handler(lambda m: m.text == DIRECTOR_BUTTON_TEXT)
-    async def director_entry(message: types.Message, state: FSMContext) -> None:
-        if not await ensure_contact_exists(message):
-            return
-        await state.finish()
-        await start_date_step(message, state, "director")
-
-    @dispatcher.message_handler(state=DirectorStates.date)
-    async def director_date(message: types.Message, state: FSMContext) -> None:
-        await process_date_message(message, state)
-
-    @dispatcher.message_handler(state=DirectorStates.time_range)
-    async def director_time_range(message: types.Message, state: FSMContext) -> None:
-        if (message.text or "").strip().lower() == BACK_COMMAND.lower():
-            await handle_back_to_date(message, state)
-            return
-        parsed_range = parse_time_range(message.text or "")
-        if not parsed_range:
-            await message.answer(
-                f"{TIME_PARSE_ERROR_MESSAGE}\n{TIME_PROMPT_MESSAGE}",
-                reply_markup=build_back_keyboard(),
-            )
-            return
-        time_from, time_to = parsed_range
-        data = await state.get_data()
+async def process_time_range_message(
+    message: types.Message, state: FSMContext, raw_state: Optional[str]
+) -> None:
+    if _is_back_command(message.text):
+        await handle_back_to_date(message, state)
+        return
+    parsed_range = parse_time_range(message.text or "")
+    if not parsed_range:
+        await message.answer(
+            f"{TIME_PARSE_ERROR_MESSAGE}\n{TIME_PROMPT_MESSAGE}",
+            reply_markup=BACK_KEYBOARD,
+        )
+        return
+    time_from, time_to = parsed_range
+    async with state.proxy() as data:
         error = validate_timeslot(
             data.get("date", ""),
             time_from,
             time_to,
         )
-        if error:
-            await message.answer(
-                f"{error}\n{TIME_PROMPT_MESSAGE}",
-                reply_markup=build_back_keyboard(),
-            )
-            return
-        await state.update_data(time_from=time_from, time_to=time_to)
+        if not error:
+            data.update(time_from=time_from, time_to=time_to)
+    if error:
         await message.answer(
-            TIME_CONFIRMATION_TEMPLATE.format(time_from=time_from, time_to=time_to),
-            reply_markup=ReplyKeyboardRemove(),
+            f"{error}\n{TIME_PROMPT_MESSAGE}",
+            reply_markup=BACK_KEYBOARD,
         )
-        if not await present_director_shop_menu(message, state, via_edit=False):
+        return
+    await message.answer(
+        TIME_CONFIRMATION_TEMPLATE.format(time_from=time_from, time_to=time_to),
+        reply_markup=REMOVE_KEYBOARD,
+    )
+    if resolve_flow(raw_state) == "director":
+        await present_director_shop_menu(message, state, via_edit=False)
+    else:
+        await present_position_step(message, state, "worker", via_edit=False)
+
+
+async def on_flow_cancel(call: CallbackQuery, state: FSMContext) -> None:
+    await state.finish()
+    await asyncio.gather(
+        call.answer("Заявка отменена"),
+        call.message.edit_text("Заявка отменена. Возвращайтесь, когда будете готовы."),
+    )
+    await start_menu(call.message)
+
+
+async def on_flow_confirm(
+    call: CallbackQuery, state: FSMContext, raw_state: Optional[str]
+) -> None:
+    flow = resolve_flow(raw_state)
+    if not flow:
+        await call.answer("Ошибка состояния", show_alert=True)
+        return
+    data = await state.get_data()
+    position_value = (data.get("position") or "").strip()
+    if not position_value:
+        await call.answer("Укажите должность", show_alert=True)
+        await present_position_step(
+            call.message,
+            state,
+            flow,
+            via_edit=True,
+            reminder="Это обязательное поле.",
+        )
+        return
+    # Промежуточное состояние защищает от повторного нажатия, не теряя черновик.
+    states_group = DirectorStates if flow == "director" else WorkerStates
+    await state.set_state(states_group.publishing.state)
+    # Сбой ответа или правки сообщения не должен оставить пользователя в publishing.
+    results = await asyncio.gather(
+        call.answer(), call.message.edit_text("Публикуем заявку..."), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logging.debug("Не удалось обновить сообщение подтверждения: %s", result)
+    spawn_publication(call.message.chat.id, call.from_user, data, flow)
+
+
+def run_director_flow(dispatcher: Dispatcher) -> None:
+    @dispatcher.message_handler(Text(equals=DIRECTOR_BUTTON_TEXT))
+    async def director_entry(message: types.Message, state: FSMContext) -> None:
+        if not await ensure_contact_exists(message):
             return
+        await state.finish()
+        await start_date_step(message, state, "director")
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data.startswith("director_shop:"), state=DirectorStates.shop
+        Regexp(r"^director_shop:(\d+)$"), state=DirectorStates.shop
     )
-    async def director_shop_choice(call: CallbackQuery, state: FSMContext) -> None:
-        shop_id = int(call.data.split(":", 1)[1])
-        shops = await fetch_shops()
+    async def director_shop_choice(
+        call: CallbackQuery, state: FSMContext, regexp: re.Match
+    ) -> None:
+        shop_id = int(regexp.group(1))
+        shops = await get_shops_cached()
         if shop_id not in shops:
             await call.answer("Такой лавки нет.", show_alert=True)
             return
@@ -1674,7 +1987,7 @@ def run_director_flow(dispatcher: Dispatcher) -> None:
         await present_position_step(call.message, state, "director", via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("director_position:"),
+        Text(startswith="director_position:"),
         state=DirectorStates.position,
     )
     async def director_position_choice(call: CallbackQuery, state: FSMContext) -> None:
@@ -1710,7 +2023,7 @@ def run_director_flow(dispatcher: Dispatcher) -> None:
         if not text:
             await message.answer(POSITION_CUSTOM_PROMPT)
             return
-        if text.lower() == BACK_COMMAND.lower():
+        if _is_back_command(text):
             await present_director_shop_menu(message, state, via_edit=False)
             return
         normalized, error = normalize_position_input(text)
@@ -1722,12 +2035,13 @@ def run_director_flow(dispatcher: Dispatcher) -> None:
 
     @dispatcher.message_handler(state=DirectorStates.note)
     async def director_note(message: types.Message, state: FSMContext) -> None:
-        if (message.text or "").strip().lower() == BACK_COMMAND.lower():
+        if _is_back_command(message.text):
             await present_position_step(message, state, "director", via_edit=False)
             return
         note_value = (message.text or "").strip()
-        await state.update_data(note=note_value)
-        data = await state.get_data()
+        data, shops = await asyncio.gather(
+            update_state_data(state, note=note_value), get_shops_cached()
+        )
         position_value = (data.get("position") or "").strip()
         if not position_value:
             await message.answer("Сначала укажите должность.")
@@ -1739,7 +2053,6 @@ def run_director_flow(dispatcher: Dispatcher) -> None:
                 reminder="Это обязательное поле.",
             )
             return
-        shops = await fetch_shops()
         selected_shop = shops.get(data.get("shop_id")) if data.get("shop_id") is not None else None
         shop_name = data.get("shop_name") or (selected_shop.name if selected_shop else "Не выбрана")
         note_display = note_value if note_value else "—"
@@ -1754,39 +2067,9 @@ def run_director_flow(dispatcher: Dispatcher) -> None:
             f"Должность: {position_value}\n"
             f"Комментарий: {note_display}"
         )
-        keyboard = InlineKeyboardMarkup().add(
-            InlineKeyboardButton("Опубликовать", callback_data="director_confirm"),
-            InlineKeyboardButton("Отмена", callback_data="director_cancel"),
-        )
-        await message.answer(summary, reply_markup=keyboard)
+        await message.answer(summary, reply_markup=DIRECTOR_CONFIRM_KEYBOARD)
         await DirectorStates.confirm.set()
 
-    @dispatcher.callback_query_handler(lambda c: c.data == "director_cancel", state=DirectorStates.confirm)
-    async def director_cancel(call: CallbackQuery, state: FSMContext) -> None:
-        await call.answer("Заявка отменена")
-        await state.finish()
-        await call.message.edit_text("Заявка отменена. Возвращайтесь, когда будете готовы.")
-        await start_menu(call.message)
-
-    @dispatcher.callback_query_handler(lambda c: c.data == "director_confirm", state=DirectorStates.confirm)
-    async def director_confirm(call: CallbackQuery, state: FSMContext) -> None:
-        data = await state.get_data()
-        position_value = (data.get("position") or "").strip()
-        if not position_value:
-            await call.answer("Укажите должность", show_alert=True)
-            await present_position_step(
-                call.message,
-                state,
-                "director",
-                via_edit=True,
-                reminder="Это обязательное поле.",
-            )
-            return
-        await call.answer()
-        await call.message.edit_text("Публикуем заявку...")
-        await handle_post_publication(call.message.chat.id, call.from_user, state, "director")
-
-
 def run_worker_flow(dispatcher: Dispatcher) -> None:
     async def present_area_menu(
         target_message: types.Message, state: FSMContext, *, via_edit: bool
@@ -1923,7 +2206,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
                 logging.debug("Не удалось обновить список лавок, отправляем новое сообщение")
         await target_message.answer(text, reply_markup=markup)
 
-    @dispatcher.message_handler(lambda m: m.text == WORKER_BUTTON_TEXT)
+    @dispatcher.message_handler(Text(equals=WORKER_BUTTON_TEXT))
     async def worker_entry(message: types.Message, state: FSMContext) -> None:
         if not await ensure_contact_exists(message):
             return
@@ -1932,7 +2215,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_area_menu(message, state, via_edit=False)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("warea:"),
+        Text(startswith="warea:"),
         state=[WorkerStates.area, WorkerStates.metro, WorkerStates.shop],
     )
     async def worker_area_choice(call: CallbackQuery, state: FSMContext) -> None:
@@ -1959,37 +2242,33 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_station_menu(call.message, state, context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("wstation_page:"),
+        Regexp(r"^wstation_page:(\d+)$"),
         state=WorkerStates.metro,
     )
-    async def worker_station_page(call: CallbackQuery, state: FSMContext) -> None:
+    async def worker_station_page(
+        call: CallbackQuery, state: FSMContext, regexp: re.Match
+    ) -> None:
         context = await get_station_context(state)
         stations = context.get("stations") or []
         if not stations:
             await call.answer("Станции недоступны", show_alert=True)
             return
-        try:
-            requested_page = int((call.data or "").split(":", 1)[1])
-        except (ValueError, IndexError):
-            await call.answer("Некорректная страница", show_alert=True)
-            return
+        requested_page = int(regexp.group(1))
         context["page"] = requested_page
         await state.update_data(worker_station=context)
         await call.answer()
         await present_station_menu(call.message, state, context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("wstation_pick:"),
+        Regexp(r"^wstation_pick:(\d+)$"),
         state=WorkerStates.metro,
     )
-    async def worker_station_pick(call: CallbackQuery, state: FSMContext) -> None:
+    async def worker_station_pick(
+        call: CallbackQuery, state: FSMContext, regexp: re.Match
+    ) -> None:
         context = await get_station_context(state)
         stations = context.get("stations") or []
-        try:
-            index = int((call.data or "").split(":", 1)[1])
-        except (ValueError, IndexError):
-            await call.answer("Некорректный выбор", show_alert=True)
-            return
+        index = int(regexp.group(1))
         if index < 0 or index >= len(stations):
             await call.answer("Станция не найдена", show_alert=True)
             return
@@ -2006,7 +2285,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_shop_menu(call.message, state, shop_context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data == "wstation_search",
+        Text(equals="wstation_search"),
         state=WorkerStates.metro,
     )
     async def worker_station_search(call: CallbackQuery, state: FSMContext) -> None:
@@ -2021,7 +2300,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
             await call.message.answer(STATION_SEARCH_PROMPT, reply_markup=markup)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data == "wstation_reset",
+        Text(equals="wstation_reset"),
         state=[WorkerStates.metro, WorkerStates.metro_search],
     )
     async def worker_station_reset(call: CallbackQuery, state: FSMContext) -> None:
@@ -2042,7 +2321,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_station_menu(call.message, state, context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data == "wstation_back_area",
+        Text(equals="wstation_back_area"),
         state=[WorkerStates.area, WorkerStates.metro, WorkerStates.metro_search, WorkerStates.shop],
     )
     async def worker_station_back_area(call: CallbackQuery, state: FSMContext) -> None:
@@ -2057,7 +2336,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         if not query:
             await message.answer("Введи название станции метро.")
             return
-        if query.lower() == BACK_COMMAND.lower():
+        if _is_back_command(query):
             await state.set_state(WorkerStates.metro.state)
             context = await get_station_context(state)
             if not context:
@@ -2097,37 +2376,33 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_station_menu(message, state, context, via_edit=False)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("wshop_page:"),
+        Regexp(r"^wshop_page:(\d+)$"),
         state=WorkerStates.shop,
     )
-    async def worker_shop_page(call: CallbackQuery, state: FSMContext) -> None:
+    async def worker_shop_page(
+        call: CallbackQuery, state: FSMContext, regexp: re.Match
+    ) -> None:
         context = await get_shop_context(state)
         if not context:
             await call.answer("Список лавок недоступен", show_alert=True)
             return
-        try:
-            requested_page = int((call.data or "").split(":", 1)[1])
-        except (ValueError, IndexError):
-            await call.answer("Некорректная страница", show_alert=True)
-            return
+        requested_page = int(regexp.group(1))
         context["page"] = requested_page
         await state.update_data(worker_shop=context)
         await call.answer()
         await present_shop_menu(call.message, state, context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("wshop_pick:"),
+        Regexp(r"^wshop_pick:(\d+)$"),
         state=WorkerStates.shop,
     )
-    async def worker_shop_pick(call: CallbackQuery, state: FSMContext) -> None:
+    async def worker_shop_pick(
+        call: CallbackQuery, state: FSMContext, regexp: re.Match
+    ) -> None:
         context = await get_shop_context(state)
         shops_list = context.get("shops") or []
         station = context.get("station") or ""
-        try:
-            index = int((call.data or "").split(":", 1)[1])
-        except (ValueError, IndexError):
-            await call.answer("Некорректная лавка", show_alert=True)
-            return
+        index = int(regexp.group(1))
         if index < 0 or index >= len(shops_list):
             await call.answer("Лавка не найдена", show_alert=True)
             return
@@ -2156,7 +2431,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await state.update_data(**preserve_data)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data == "wshop_back",
+        Text(equals="wshop_back"),
         state=[WorkerStates.metro, WorkerStates.shop],
     )
     async def worker_shop_back(call: CallbackQuery, state: FSMContext) -> None:
@@ -2170,7 +2445,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await present_station_menu(call.message, state, context, via_edit=True)
 
     @dispatcher.callback_query_handler(
-        lambda c: c.data == "wshop_reset",
+        Text(equals="wshop_reset"),
         state=[WorkerStates.metro, WorkerStates.shop],
     )
     async def worker_shop_reset(call: CallbackQuery, state: FSMContext) -> None:
@@ -2179,44 +2454,8 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         await state.set_data({})
         await present_area_menu(call.message, state, via_edit=True)
 
-    @dispatcher.message_handler(state=WorkerStates.date)
-    async def worker_date(message: types.Message, state: FSMContext) -> None:
-        await process_date_message(message, state)
-
-    @dispatcher.message_handler(state=WorkerStates.time_range)
-    async def worker_time_range(message: types.Message, state: FSMContext) -> None:
-        if (message.text or "").strip().lower() == BACK_COMMAND.lower():
-            await handle_back_to_date(message, state)
-            return
-        parsed_range = parse_time_range(message.text or "")
-        if not parsed_range:
-            await message.answer(
-                f"{TIME_PARSE_ERROR_MESSAGE}\n{TIME_PROMPT_MESSAGE}",
-                reply_markup=build_back_keyboard(),
-            )
-            return
-        time_from, time_to = parsed_range
-        data = await state.get_data()
-        error = validate_timeslot(
-            data.get("date", ""),
-            time_from,
-            time_to,
-        )
-        if error:
-            await message.answer(
-                f"{error}\n{TIME_PROMPT_MESSAGE}",
-                reply_markup=build_back_keyboard(),
-            )
-            return
-        await state.update_data(time_from=time_from, time_to=time_to)
-        await message.answer(
-            TIME_CONFIRMATION_TEMPLATE.format(time_from=time_from, time_to=time_to),
-            reply_markup=ReplyKeyboardRemove(),
-        )
-        await present_position_step(message, state, "worker", via_edit=False)
-
     @dispatcher.callback_query_handler(
-        lambda c: c.data and c.data.startswith("worker_position:"),
+        Text(startswith="worker_position:"),
         state=WorkerStates.position,
     )
     async def worker_position_choice(call: CallbackQuery, state: FSMContext) -> None:
@@ -2256,7 +2495,7 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
         if not text:
             await message.answer(POSITION_CUSTOM_PROMPT)
             return
-        if text.lower() == BACK_COMMAND.lower():
+        if _is_back_command(text):
             await prompt_time_range(message, state, "worker")
             return
         normalized, error = normalize_position_input(text)
@@ -2268,11 +2507,13 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
 
     @dispatcher.message_handler(state=WorkerStates.note)
     async def worker_note(message: types.Message, state: FSMContext) -> None:
-        if (message.text or "").strip().lower() == BACK_COMMAND.lower():
+        if _is_back_command(message.text):
             await present_position_step(message, state, "worker", via_edit=False)
             return
-        await state.update_data(note=(message.text or "").strip())
-        data = await state.get_data()
+        data, shops = await asyncio.gather(
+            update_state_data(state, note=(message.text or "").strip()),
+            get_shops_cached(),
+        )
         position_value = (data.get("position") or "").strip()
         if not position_value:
             await message.answer("Сначала выберите должность.")
@@ -2285,7 +2526,6 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
             )
             return
         note_value = (data.get("note") or "").strip()
-        shops = await fetch_shops()
         selected_shop = shops.get(data.get("shop_id")) if data.get("shop_id") is not None else None
         shop_name = data.get("shop_name") or (selected_shop.name if selected_shop else "Любая лавка")
         station = data.get("chosen_metro") or "Не выбрано"
@@ -2306,38 +2546,9 @@ def run_worker_flow(dispatcher: Dispatcher) -> None:
             f"Желаемая должность: {position_value}\n"
             f"Пожелания: {note_display}"
         )
-        keyboard = InlineKeyboardMarkup().add(
-            InlineKeyboardButton("Опубликовать", callback_data="worker_confirm"),
-            InlineKeyboardButton("Отмена", callback_data="worker_cancel"),
-        )
-        await message.answer(summary, reply_markup=keyboard)
+        await message.answer(summary, reply_markup=WORKER_CONFIRM_KEYBOARD)
         await WorkerStates.confirm.set()
 
-    @dispatcher.callback_query_handler(lambda c: c.data == "worker_cancel", state=WorkerStates.confirm)
-    async def worker_cancel(call: CallbackQuery, state: FSMContext) -> None:
-        await call.answer("Заявка отменена")
-        await state.finish()
-        await call.message.edit_text("Заявка отменена. Возвращайтесь, когда будете готовы.")
-        await start_menu(call.message)
-
-    @dispatcher.callback_query_handler(lambda c: c.data == "worker_confirm", state=WorkerStates.confirm)
-    async def worker_confirm(call: CallbackQuery, state: FSMContext) -> None:
-        data = await state.get_data()
-        position_value = (data.get("position") or "").strip()
-        if not position_value:
-            await call.answer("Укажите должность", show_alert=True)
-            await present_position_step(
-                call.message,
-                state,
-                "worker",
-                via_edit=True,
-                reminder="Это обязательное поле.",
-            )
-            return
-        await call.answer()
-        await call.message.edit_text("Публикуем заявку...")
-        await handle_post_publication(call.message.chat.id, call.from_user, state, "worker")
-
 @dp.message_handler(commands=["refresh_shops"], state="*")
 async def cmd_refresh_shops(message: types.Message, state: FSMContext) -> None:
     if not message.from_user or message.from_user.id not in ADMINS:
@@ -2350,6 +2561,7 @@ async def cmd_refresh_shops(message: types.Message, state: FSMContext) -> None:
         logging.exception("Не удалось обновить справочник лавок по команде /refresh_shops: %s", exc)
         await message.answer("Не удалось обновить справочник лавок. Проверьте логи.")
         return
+    invalidate_shops_cache()
     shops = storage.get_shops()
     updated_at = storage.get_shops_updated_at()
     if updated_at:
@@ -2380,9 +2592,10 @@ async def registration_contact(message: types.Message, state: FSMContext) -> Non
         )
         return
     await ensure_user(message.from_user, phone_number=contact.phone_number)
+    remember_contact(message.from_user.id)
     await state.finish()
     await message.answer(
-        "Спасибо! Контакт сохранён.", reply_markup=ReplyKeyboardRemove()
+        "Спасибо! Контакт сохранён.", reply_markup=REMOVE_KEYBOARD
     )
     await start_menu(message)
 
@@ -2397,8 +2610,18 @@ async def registration_waiting(message: types.Message) -> None:
 
 @dp.errors_handler()
 async def on_error(update: types.Update, error: Exception) -> bool:
+    global _tech_error_window_start, _tech_error_count
     logging.exception("Ошибка при обработке апдейта: %s", error)
-    await send_tech(f"Ошибка: {error}")
+    now = time.monotonic()
+    if now - _tech_error_window_start >= 1.0:
+        _tech_error_window_start = now
+        _tech_error_count = 0
+    if _tech_error_count >= TECH_ERROR_ALERTS_PER_SECOND:
+        return True
+    _tech_error_count += 1
+    task = asyncio.create_task(send_tech(f"Ошибка: {error}"))
+    tech_error_tasks.add(task)
+    task.add_done_callback(tech_error_tasks.discard)
     return True
 
 
@@ -2425,6 +2648,18 @@ async def on_startup(_: Dispatcher) -> None:
 
 
 async def on_shutdown(_: Dispatcher) -> None:
+    pending = publication_tasks | tech_error_tasks
+    if pending:
+        # Зависшая публикация не должна мешать сбросу очередей записи в таблицу.
+        _, still_running = await asyncio.wait(pending, timeout=SHUTDOWN_TASKS_TIMEOUT_SECONDS)
+        if still_running:
+            logging.warning(
+                "Останавливаем %s незавершённых фоновых задач", len(still_running)
+            )
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+    await storage.shutdown()
     global shops_refresh_task
     if shops_refresh_task:
         shops_refresh_task.cancel()
@@ -2447,16 +2682,34 @@ async def on_shutdown(_: Dispatcher) -> None:
 
 
 def register_handlers() -> None:
+    dp.middleware.setup(ConcurrentDispatchMiddleware())
     run_director_flow(dp)
     run_worker_flow(dp)
+    dp.register_message_handler(
+        process_date_message, state=[DirectorStates.date, WorkerStates.date]
+    )
+    dp.register_message_handler(
+        process_time_range_message,
+        state=[DirectorStates.time_range, WorkerStates.time_range],
+    )
+    dp.register_callback_query_handler(
+        on_flow_cancel,
+        Text(equals=["director_cancel", "worker_cancel"]),
+        state=[DirectorStates.confirm, WorkerStates.confirm],
+    )
+    dp.register_callback_query_handler(
+        on_flow_confirm,
+        Text(equals=["director_confirm", "worker_confirm"]),
+        state=[DirectorStates.confirm, WorkerStates.confirm],
+    )
     dp.register_callback_query_handler(
         on_pick_date_selection,
-        lambda c: c.data and c.data.startswith("pick_date:"),
+        Text(startswith="pick_date:"),
         state=[DirectorStates.date, WorkerStates.date],
     )
     dp.register_message_handler(
         handle_back_to_date,
-        lambda m: (m.text or "").strip().lower() == BACK_COMMAND.lower(),
+        lambda m: _is_back_command(m.text),
         state=[
             DirectorStates.time_range,
             DirectorStates.shop,
@@ -2469,12 +2722,18 @@ def register_handlers() -> None:
         ],
     )
     dp.register_callback_query_handler(
-        on_disabled_callback, lambda c: c.data == DISABLED_CALLBACK_DATA
+        on_disabled_callback, Text(equals=DISABLED_CALLBACK_DATA)
     )
-    dp.register_callback_query_handler(on_callback_pick, lambda c: c.data and c.data.startswith("pick:"))
+    dp.register_callback_query_handler(on_callback_pick, Text(startswith="pick:"))
 
 
 def main() -> None:
+    try:
+        import uvloop
+    except ImportError:
+        logging.info("uvloop не установлен, используется стандартный цикл asyncio")
+    else:
+        uvloop.install()
     register_handlers()
     if WEBHOOK_URL:
         executor.start_webhook(
@@ -4,19 +4,31 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import copy
+import dataclasses
+import functools
+import hashlib
 import json
 import logging
+import operator
 import os
-from dataclasses import dataclass
+import re
+import sys
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from threading import RLock
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from threading import Event, Lock, RLock
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import gspread
-from gspread.utils import rowcol_to_a1
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 LOGGER = logging.getLogger(__name__)
@@ -28,6 +40,7 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
+HTTP_POOL_SIZE = 16
 
 REQUESTS_SHEET = "Requests"
 USERS_SHEET = "Users"
@@ -87,13 +100,12 @@ METRO_AREAS_HEADERS = [
 ]
 
 
-@dataclass(frozen=True)
-class ShopMetro:
+class ShopMetro(NamedTuple):
     name: str
     distance_m: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ShopRecord:
     id: int
     name: str
@@ -101,22 +113,20 @@ class ShopRecord:
     is_active: bool = True
 
 
-@dataclass(frozen=True)
-class ShopLocation:
+class ShopLocation(NamedTuple):
     shop_id: int
     shop_name: str
     distance_m: int
 
 
-@dataclass(frozen=True)
-class StationSummary:
+class StationSummary(NamedTuple):
     name: str
     area_id: str
     area_name: str
     shop_count: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AreaSummary:
     area_id: str
     area_name: str
@@ -126,22 +136,56 @@ class AreaSummary:
     stations: Tuple[StationSummary, ...]
 
 
+@dataclass(frozen=True)
+class _ReferenceSnapshot:
+    shops: Dict[int, ShopRecord] = field(default_factory=dict)
+    active_shops: Mapping[int, ShopRecord] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    metro_cache: Dict[str, Tuple[ShopLocation, ...]] = field(default_factory=dict)
+    stations: Tuple[str, ...] = ()
+    station_summaries: Tuple[StationSummary, ...] = ()
+    station_by_name: Dict[str, StationSummary] = field(default_factory=dict)
+    search_index: Tuple[Tuple[str, StationSummary], ...] = ()
+    ngram_index: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    prefix_index: Dict[str, Tuple[StationSummary, ...]] = field(default_factory=dict)
+    search_results: Dict[Tuple[str, int], Tuple[StationSummary, ...]] = field(
+        default_factory=dict
+    )
+    area_summaries: Dict[str, AreaSummary] = field(default_factory=dict)
+    area_list: Tuple[AreaSummary, ...] = ()
+    updated_at: Optional[datetime] = None
+
+
 _client = None
+# Флаг выставляется только после полной инициализации, поэтому упавшая
+# на полпути попытка повторится при следующем обращении.
+_INITIALIZED = Event()
+_INIT_LOCK = Lock()
 _spreadsheet = None
 _requests_ws = None
 _users_ws = None
 _shops_ws = None
 _metro_areas_ws = None
-SHOPS_CACHE: Dict[int, ShopRecord] = {}
-METRO_CACHE: Dict[str, Tuple[ShopLocation, ...]] = {}
-STATIONS_CACHE: Tuple[str, ...] = ()
-STATION_SUMMARY_CACHE: Tuple[StationSummary, ...] = ()
-STATION_SUMMARY_BY_NAME: Dict[str, StationSummary] = {}
-STATION_SEARCH_INDEX: Tuple[Tuple[str, StationSummary], ...] = ()
-AREA_SUMMARY_CACHE: Dict[str, AreaSummary] = {}
-AREA_SUMMARY_LIST: Tuple[AreaSummary, ...] = ()
-SHOPS_CACHE_UPDATED_AT: Optional[datetime] = None
+# Справочник читается без блокировки: загрузка собирает новый снимок
+# и подменяет ссылку на него целиком. _SHOPS_LOCK сериализует только загрузки.
+_SNAPSHOT = _ReferenceSnapshot()
+_CACHE_DEADLINE = 0.0
+_REFERENCE_DIGEST: Optional[bytes] = None
 _SHOPS_LOCK = RLock()
+_USERS_ROW_INDEX: Dict[str, int] = {}
+_USERS_NEXT_ROW = 0
+_USERS_LOCK = RLock()
+_NEXT_REQUEST_ID: Optional[int] = None
+_NEXT_REQUEST_ROW: Optional[int] = None
+_REQUEST_COUNTER_LOCK = Lock()
+_REQUEST_ROW_INDEX: Dict[int, int] = {}
+_ROW_INDEX_LOCK = Lock()
+_REQUEST_CACHE: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_REQUEST_CACHE_LOCK = Lock()
+_REQUEST_CACHE_GENERATION = 0
+REQUEST_CACHE_SIZE = 256
+REQUEST_CACHE_TTL_SECONDS = 60.0
 
 CACHE_TTL_SECONDS = 15 * 60
 
@@ -182,6 +226,8 @@ AREA_ORDER: Tuple[str, ...] = (
 )
 
 UNKNOWN_DISTANCE_FALLBACK_M = 9999
+SEARCH_NGRAM_SIZE = 3
+SEARCH_RESULTS_CACHE_SIZE = 1024
 
 
 def _decode_service_account() -> Dict[str, Any]:
@@ -194,42 +240,110 @@ def _decode_service_account() -> Dict[str, Any]:
         raise RuntimeError("Failed to decode GOOGLE_SERVICE_ACCOUNT_JSON_BASE64") from exc
 
 
+def _build_http_session(credentials: Credentials) -> AuthorizedSession:
+    session = AuthorizedSession(credentials)
+    # Повторяем только идемпотентные запросы: POST (append, batch update) не трогаем.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # Последний ответ отдаём gspread, чтобы он поднял привычный APIError.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    return session
+
+
 def _ensure_initialized() -> None:
+    if _INITIALIZED.is_set():
+        return
+    with _INIT_LOCK:
+        if _INITIALIZED.is_set():
+            return
+        _initialize_sync()
+        _INITIALIZED.set()
+
+
+def _initialize_sync() -> None:
     global _client, _spreadsheet, _requests_ws, _users_ws, _shops_ws, _metro_areas_ws
 
-    if _client is not None:
-        return
-    
     if not SPREADSHEET_ID:
         raise RuntimeError("GOOGLE_SPREADSHEET_ID is required")
     
     _credentials_info = _decode_service_account()
     _credentials = Credentials.from_service_account_info(_credentials_info, scopes=SCOPES)
-    _client = gspread.authorize(_credentials)
+    http_client = functools.partial(
+        gspread.http_client.HTTPClient, session=_build_http_session(_credentials)
+    )
+    _client = gspread.Client(_credentials, http_client=http_client)
     _spreadsheet = _client.open_by_key(SPREADSHEET_ID)
     
-    _requests_ws = _get_or_create_worksheet(REQUESTS_SHEET)
-    _ensure_headers(_requests_ws, REQUESTS_HEADERS)
-    
-    _users_ws = _get_or_create_worksheet(USERS_SHEET)
-    _ensure_headers(_users_ws, USERS_HEADERS)
-    
-    _shops_ws = _get_or_create_worksheet(SHOPS_SHEET)
-    _ensure_headers(_shops_ws, SHOPS_HEADERS)
-
+    worksheets = {ws.title: ws for ws in _spreadsheet.worksheets()}
+    _requests_ws = _get_or_create_worksheet(REQUESTS_SHEET, worksheets)
+    _users_ws = _get_or_create_worksheet(USERS_SHEET, worksheets)
+    _shops_ws = _get_or_create_worksheet(SHOPS_SHEET, worksheets)
     try:
-        _metro_areas_ws = _get_or_create_worksheet(METRO_AREAS_SHEET)
-        _ensure_headers(_metro_areas_ws, METRO_AREAS_HEADERS)
+        _metro_areas_ws = _get_or_create_worksheet(METRO_AREAS_SHEET, worksheets)
     except Exception as exc:  # noqa: BLE001
         LOGGER.exception("Не удалось получить лист MetroAreas: %s", exc)
         _metro_areas_ws = None
 
-    _load_reference_cache()
+    ranges = [
+        _sheet_range(REQUESTS_SHEET, "1:1"),
+        _sheet_range(REQUESTS_SHEET, "A:A"),
+        _sheet_range(USERS_SHEET, "1:1"),
+        _sheet_range(USERS_SHEET, "A:A"),
+        *_reference_ranges(),
+    ]
+    (
+        requests_values,
+        request_id_values,
+        users_values,
+        user_id_values,
+        shop_values,
+        *rest,
+    ) = _batch_get_values(ranges)
+    metro_values = rest[0] if rest else []
+    request_ids = [row[0] if row else "" for row in request_id_values[1:]]
+    _seed_request_counter(request_ids)
+    _index_request_ids(request_ids)
+    _index_user_ids([row[0] if row else "" for row in user_id_values])
+
+    header_checks = [
+        (_requests_ws, REQUESTS_HEADERS, requests_values[:1]),
+        (_users_ws, USERS_HEADERS, users_values[:1]),
+        (_shops_ws, SHOPS_HEADERS, shop_values[:1]),
+    ]
+    if _metro_areas_ws is not None:
+        header_checks.append((_metro_areas_ws, METRO_AREAS_HEADERS, metro_values[:1]))
+    with ThreadPoolExecutor(max_workers=len(header_checks)) as executor:
+        header_futures = [executor.submit(_ensure_headers, *check) for check in header_checks]
+    header_futures[0].result()
+    header_futures[1].result()
+    shop_values = [header_futures[2].result()] + shop_values[1:]
+    if _metro_areas_ws is not None:
+        try:
+            metro_values = [header_futures[3].result()] + metro_values[1:]
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.exception("Не удалось получить лист MetroAreas: %s", exc)
+            _metro_areas_ws = None
+            metro_values = []
+
+    _load_reference_cache(shop_values, metro_values)
 
 
-def _get_or_create_worksheet(title: str) -> gspread.Worksheet:
+def _get_or_create_worksheet(
+    title: str, existing: Optional[Dict[str, gspread.Worksheet]] = None
+) -> gspread.Worksheet:
     if _spreadsheet is None:
         raise RuntimeError("Spreadsheet not initialized")
+    if existing is not None and title in existing:
+        return existing[title]
     try:
         return _spreadsheet.worksheet(title)
     except gspread.WorksheetNotFound:
@@ -237,13 +351,62 @@ def _get_or_create_worksheet(title: str) -> gspread.Worksheet:
         return _spreadsheet.add_worksheet(title=title, rows=1000, cols=26)
 
 
-def _ensure_headers(ws: gspread.Worksheet, headers: Iterable[str]) -> None:
+def _ensure_headers(
+    ws: gspread.Worksheet,
+    headers: Iterable[str],
+    current_rows: Optional[List[List[str]]] = None,
+) -> List[str]:
+    """Make sure the header row starts with ``headers`` and return the resulting row."""
+
     headers = list(headers)
-    current = ws.row_values(1)
+    if current_rows is None:
+        current = ws.row_values(1)
+    else:
+        current = list(current_rows[0]) if current_rows else []
     if current[: len(headers)] != headers:
         ws.update("A1", [headers])
+        current = headers + current[len(headers) :]
+    return current
+
+
+def _sheet_range(title: str, cells: str = "") -> str:
+    quoted = "'" + title.replace("'", "''") + "'"
+    return f"{quoted}!{cells}" if cells else quoted
+
+
+def _reference_ranges() -> List[str]:
+    ranges = [_sheet_range(SHOPS_SHEET, f"A:{_column_letter(len(SHOPS_HEADERS))}")]
+    if _metro_areas_ws is not None:
+        ranges.append(
+            _sheet_range(METRO_AREAS_SHEET, f"A:{_column_letter(len(METRO_AREAS_HEADERS))}")
+        )
+    return ranges
+
+
+def _batch_get_values(ranges: List[str]) -> List[List[List[str]]]:
+    if _spreadsheet is None:
+        raise RuntimeError("Spreadsheet not initialized")
+    response = _spreadsheet.values_batch_get(ranges)
+    value_ranges = response.get("valueRanges", [])
+    values = [item.get("values", []) for item in value_ranges]
+    values.extend([] for _ in range(len(ranges) - len(values)))
+    return values
+
+
+def _utcnow_iso() -> str:
+    """Current UTC time in the ISO format written to the sheets."""
+
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{micros:06d}+00:00"
+
 
+def _pad_row(row: List[str], width: int) -> List[str]:
+    if len(row) >= width:
+        return row[:width]
+    return row + [""] * (width - len(row))
 
+
+@functools.lru_cache(maxsize=64)
 def _column_letter(index: int) -> str:
     index = int(index)
     if index < 1:
@@ -255,8 +418,26 @@ def _column_letter(index: int) -> str:
     return result
 
 
+def _get_row_sync(ws: gspread.Worksheet, row_number: int, end_column: str) -> List[str]:
+    values = ws.get(f"A{row_number}:{end_column}{row_number}")
+    return list(values[0]) if values else []
+
+
 REQUESTS_COLUMNS = {name: idx + 1 for idx, name in enumerate(REQUESTS_HEADERS)}
+_REQUESTS_END_COLUMN = _column_letter(len(REQUESTS_HEADERS))
+_REQUESTS_ID_COL = REQUESTS_COLUMNS["id"]
+_REQUESTS_COLUMN_LETTERS = {
+    name: _column_letter(index) for name, index in REQUESTS_COLUMNS.items()
+}
+_REQUESTS_STATUS_A1 = _REQUESTS_COLUMN_LETTERS["status"]
+_REQUESTS_UPDATED_AT_A1 = _REQUESTS_COLUMN_LETTERS["updated_at"]
+_REQUESTS_CHANNEL_A1 = _REQUESTS_COLUMN_LETTERS["channel_message_id"]
+_LOCATION_SORT_KEY = operator.itemgetter(0, 1)
+_DISTANCE_COLUMNS = tuple(f"dist_{suffix}_m" for suffix in ("1", "2", "3"))
+_DISTANCE_STRIP_RE = re.compile(r"[м\s]")
+_UPDATED_RANGE_ROW_RE = re.compile(r"![A-Z]+(\d+)")
 USERS_COLUMNS = {name: idx + 1 for idx, name in enumerate(USERS_HEADERS)}
+_USERS_END_COLUMN = _column_letter(len(USERS_HEADERS))
 
 
 def _parse_int(value: Any, default: int) -> int:
@@ -339,17 +520,20 @@ def _normalize_request_row(row: Dict[str, Any]) -> Dict[str, Any]:
         end_dt_iso = end_dt_iso.isoformat()
     data["end_dt_iso"] = str(end_dt_iso or "")
     if not data.get("shop_name") and data.get("shop_id"):
-        record = SHOPS_CACHE.get(data["shop_id"])
+        record = _SNAPSHOT.shops.get(data["shop_id"])
         if record:
             data["shop_name"] = record.name
     return data
 
 
+_FALSE_VALUES = frozenset({"0", "false", "нет", "no"})
+
+
 def _parse_bool(value: Any) -> bool:
     text = str(value or "1").strip().lower()
     if not text:
         return True
-    return text not in {"0", "false", "нет", "no"}
+    return text not in _FALSE_VALUES
 
 
 def _parse_distance(value: Any, *, row_number: int, column: str, shop_name: str) -> Optional[int]:
@@ -361,8 +545,9 @@ def _parse_distance(value: Any, *, row_number: int, column: str, shop_name: str)
         text = str(value).strip()
         if not text:
             return None
-        normalized = text.lower().replace("м", "").replace("\u00a0", " ").strip()
-        normalized = normalized.replace(",", ".")
+        if text.isascii() and text.isdigit():
+            return int(text)
+        normalized = _DISTANCE_STRIP_RE.sub("", text.lower()).replace(",", ".")
         try:
             distance = float(normalized)
         except ValueError:
@@ -405,33 +590,33 @@ def _get_area_display_name(area_id: str, area_name: Optional[str]) -> str:
     return preset.get("fallback_name") or DEFAULT_AREA_NAME
 
 
+_STATION_SEARCH_TABLE = str.maketrans(
+    {"ё": "е", **{char: None for char in "-–—_ ()«»"}}
+)
+
+
+@functools.lru_cache(maxsize=4096)
 def _normalize_station_for_search(value: str) -> str:
-    text = (value or "").strip().lower()
-    text = text.replace("ё", "е")
-    for char in ("-", "–", "—", "_", " "):
-        text = text.replace(char, "")
-    text = text.replace("(", "").replace(")", "")
-    text = text.replace("«", "").replace("»", "")
-    return text
-
-
-def _load_metro_areas_map() -> Dict[str, Tuple[str, str]]:
-    if _metro_areas_ws is None:
-        return {}
-    try:
-        records = _metro_areas_ws.get_all_records(expected_headers=METRO_AREAS_HEADERS)
-    except Exception as exc:  # noqa: BLE001
-        LOGGER.exception("Не удалось загрузить лист MetroAreas: %s", exc)
-        return {}
+    return (value or "").strip().lower().translate(_STATION_SEARCH_TABLE)
+
+
+def _iter_ngrams(text: str) -> Iterable[str]:
+    return {
+        text[start : start + SEARCH_NGRAM_SIZE]
+        for start in range(len(text) - SEARCH_NGRAM_SIZE + 1)
+    }
+
+
+def _load_metro_areas_map(values: List[List[str]]) -> Dict[str, Tuple[str, str]]:
     mapping: Dict[str, Tuple[str, str]] = {}
-    for row in records:
-        station = (row.get("station") or "").strip()
+    for row in values[1:]:
+        raw_station, raw_area_id, raw_area_name = _pad_row(row, len(METRO_AREAS_HEADERS))
+        station = raw_station.strip()
         if not station:
             continue
-        raw_area_id = (row.get("area_id") or "").strip().upper()
-        area_id = raw_area_id or DEFAULT_AREA_ID
-        area_name = _get_area_display_name(area_id, (row.get("area_name") or "").strip())
-        mapping[station] = (area_id, area_name)
+        area_id = raw_area_id.strip().upper() or DEFAULT_AREA_ID
+        area_name = _get_area_display_name(area_id, raw_area_name.strip())
+        mapping[sys.intern(station)] = (sys.intern(area_id), sys.intern(area_name))
     return mapping
 
 
@@ -452,39 +637,69 @@ def _area_sort_key(area_id: str, title: str) -> Tuple[int, str]:
     return order_index, title.lower()
 
 
-def _load_reference_cache() -> None:
-    global SHOPS_CACHE
-    global METRO_CACHE
-    global STATIONS_CACHE
-    global STATION_SUMMARY_CACHE
-    global STATION_SUMMARY_BY_NAME
-    global STATION_SEARCH_INDEX
-    global AREA_SUMMARY_CACHE
-    global AREA_SUMMARY_LIST
-    global SHOPS_CACHE_UPDATED_AT
-
+def _fetch_reference_values() -> Optional[Tuple[List[List[str]], List[List[str]]]]:
     if _shops_ws is None:
         raise RuntimeError("Shops worksheet not initialized")
-
-    area_mapping = _load_metro_areas_map()
-
     try:
-        values = _shops_ws.get_all_records(expected_headers=SHOPS_HEADERS)
+        shop_values, *rest = _batch_get_values(_reference_ranges())
     except Exception as exc:  # noqa: BLE001
-        LOGGER.exception("Не удалось загрузить лист Shops: %s", exc)
-        return
+        LOGGER.exception("Не удалось загрузить листы Shops и MetroAreas: %s", exc)
+        return None
+    return shop_values, rest[0] if rest else []
+
+
+def _reference_digest(
+    shop_values: List[List[str]], metro_values: List[List[str]]
+) -> bytes:
+    payload = json.dumps([shop_values, metro_values], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+def _load_reference_cache(
+    shop_values: Optional[List[List[str]]] = None,
+    metro_values: Optional[List[List[str]]] = None,
+) -> None:
+    """Refresh the reference snapshot from the Shops and MetroAreas sheets.
+
+    Both sheets are still downloaded on every refresh; the digest only lets an
+    unchanged download skip rebuilding the snapshot and its search indexes.
+    """
+
+    global _SNAPSHOT, _CACHE_DEADLINE, _REFERENCE_DIGEST
+
+    with _SHOPS_LOCK:
+        if shop_values is None:
+            fetched = _fetch_reference_values()
+            if fetched is None:
+                return
+            shop_values, metro_values = fetched
+        metro_values = metro_values or []
+        digest = _reference_digest(shop_values, metro_values)
+        if digest == _REFERENCE_DIGEST:
+            # Листы скачаны, но не менялись: пересборку индексов пропускаем,
+            # обновляем только отметку времени.
+            _SNAPSHOT = dataclasses.replace(_SNAPSHOT, updated_at=datetime.now(timezone.utc))
+        else:
+            _SNAPSHOT = _build_reference_snapshot(shop_values, metro_values)
+            _REFERENCE_DIGEST = digest
+        _CACHE_DEADLINE = time.monotonic() + CACHE_TTL_SECONDS
+
+
+def _build_reference_snapshot(
+    shop_values: List[List[str]], metro_values: List[List[str]]
+) -> _ReferenceSnapshot:
+    area_mapping = _load_metro_areas_map(metro_values)
 
     shops: Dict[int, ShopRecord] = {}
-    metro_map: Dict[str, Dict[int, int]] = {}
-    station_area_map: Dict[str, Tuple[str, str]] = {}
+    metro_map: Dict[str, Dict[int, int]] = defaultdict(dict)
 
-    for idx, row in enumerate(values, start=2):
-        raw_id = row.get("id")
-        name = (row.get("name") or "").strip()
+    for idx, row in enumerate(shop_values[1:], start=2):
+        raw_id, raw_name, raw_active, *metro_cells = _pad_row(row, len(SHOPS_HEADERS))
+        name = raw_name.strip()
         if not name:
             continue
         try:
-            shop_id = int(raw_id) if raw_id not in (None, "") else idx - 1
+            shop_id = int(raw_id) if raw_id else idx - 1
         except (TypeError, ValueError):
             LOGGER.warning(
                 "Некорректный идентификатор лавки '%s' в строке %s. Будет использован порядковый номер.",
@@ -493,19 +708,18 @@ def _load_reference_cache() -> None:
             )
             shop_id = idx - 1
 
-        is_active = _parse_bool(row.get("is_active"))
+        is_active = _parse_bool(raw_active)
         metros: List[ShopMetro] = []
-        for suffix in ("1", "2", "3"):
-            station = (row.get(f"metro_{suffix}") or "").strip()
-            distance_value = row.get(f"dist_{suffix}_m")
+        for column, raw_station, distance_value in zip(
+            _DISTANCE_COLUMNS, metro_cells[0::2], metro_cells[1::2]
+        ):
+            station = sys.intern(raw_station.strip())
             if not station:
                 continue
-            area_id, area_name = _resolve_station_area(station, area_mapping)
-            station_area_map[station] = (area_id, area_name)
             distance = _parse_distance(
                 distance_value,
                 row_number=idx,
-                column=f"dist_{suffix}_m",
+                column=column,
                 shop_name=name,
             )
             if distance is None:
@@ -515,15 +729,15 @@ def _load_reference_cache() -> None:
                     station,
                     name,
                     idx,
-                    f"dist_{suffix}_m",
+                    column,
                     UNKNOWN_DISTANCE_FALLBACK_M,
                 )
                 distance = UNKNOWN_DISTANCE_FALLBACK_M
             metros.append(ShopMetro(name=station, distance_m=distance))
-            metro_map.setdefault(station, {})
-            current = metro_map[station].get(shop_id)
+            per_station = metro_map[station]
+            current = per_station.get(shop_id)
             if current is None or distance < current:
-                metro_map[station][shop_id] = distance
+                per_station[shop_id] = distance
 
         record = ShopRecord(id=shop_id, name=name, metros=tuple(metros), is_active=is_active)
         shops[shop_id] = record
@@ -533,23 +747,33 @@ def _load_reference_cache() -> None:
 
     metro_cache: Dict[str, Tuple[ShopLocation, ...]] = {}
     area_station_map: Dict[str, List[StationSummary]] = defaultdict(list)
-    area_shop_sets: Dict[str, set[int]] = defaultdict(set)
+    # Лавки района храним битовой маской: бит = порядковый номер лавки.
+    shop_bits = {shop_id: 1 << position for position, shop_id in enumerate(shops)}
+    area_shop_bits: Dict[str, int] = defaultdict(int)
     station_summaries: List[StationSummary] = []
     search_index: List[Tuple[str, StationSummary]] = []
     area_names: Dict[str, str] = {}
 
-    for station, per_shop in metro_map.items():
-        locations = [
-            ShopLocation(shop_id=s_id, shop_name=shops[s_id].name, distance_m=dist)
+    # Станции обходим в алфавитном порядке: списки станций получаются
+    # отсортированными по имени без отдельной сортировки.
+    for station in sorted(metro_map, key=str.lower):
+        per_shop = metro_map[station]
+        decorated = [
+            (
+                dist,
+                shops[s_id].name.lower(),
+                ShopLocation(shop_id=s_id, shop_name=shops[s_id].name, distance_m=dist),
+            )
             for s_id, dist in per_shop.items()
             if shops.get(s_id) and shops[s_id].is_active
         ]
-        if not locations:
+        if not decorated:
             continue
-        locations.sort(key=lambda item: (item.distance_m, item.shop_name.lower()))
+        decorated.sort(key=_LOCATION_SORT_KEY)
+        locations = [entry[2] for entry in decorated]
         metro_cache[station] = tuple(locations)
 
-        area_id, area_name = _resolve_station_area(station, station_area_map)
+        area_id, area_name = _resolve_station_area(station, area_mapping)
         area_names.setdefault(area_id, area_name)
 
         summary = StationSummary(
@@ -560,7 +784,8 @@ def _load_reference_cache() -> None:
         )
         station_summaries.append(summary)
         area_station_map[area_id].append(summary)
-        area_shop_sets[area_id].update(location.shop_id for location in locations)
+        for location in locations:
+            area_shop_bits[area_id] |= shop_bits[location.shop_id]
         search_index.append((_normalize_station_for_search(station), summary))
 
     stations = tuple(sorted(station.name for station in station_summaries))
@@ -570,64 +795,75 @@ def _load_reference_cache() -> None:
     for area_id, items in area_station_map.items():
         if not items:
             continue
-        items.sort(key=lambda entry: (-entry.shop_count, entry.name.lower()))
+        items.sort(key=lambda entry: -entry.shop_count)
         preset = _get_area_preset(area_id)
         emoji = preset.get("emoji", "")
         title = preset.get("title") or area_names.get(area_id) or area_id
         area_name = area_names.get(area_id) or preset.get("fallback_name") or area_id
-        shop_ids = area_shop_sets.get(area_id, set())
         area_summary = AreaSummary(
             area_id=area_id,
             area_name=area_name,
             emoji=emoji,
             title=title,
-            shop_count=len(shop_ids),
+            shop_count=area_shop_bits[area_id].bit_count(),
             stations=tuple(items),
         )
         area_summaries[area_id] = area_summary
         area_list.append(area_summary)
 
     area_list.sort(key=lambda summary: _area_sort_key(summary.area_id, summary.title))
-    station_summaries.sort(key=lambda entry: entry.name.lower())
     search_index.sort(key=lambda pair: pair[0])
+    ngram_postings: Dict[str, List[int]] = defaultdict(list)
+    for position, (normalized_name, _) in enumerate(search_index):
+        for ngram in _iter_ngrams(normalized_name):
+            ngram_postings[ngram].append(position)
+    prefix_postings: Dict[str, List[StationSummary]] = defaultdict(list)
+    for normalized_name, summary in search_index:
+        for end in range(1, len(normalized_name) + 1):
+            prefix_postings[normalized_name[:end]].append(summary)
+    ngram_index = {ngram: tuple(positions) for ngram, positions in ngram_postings.items()}
+    prefix_index = {
+        prefix: tuple(sorted(items, key=lambda entry: (-entry.shop_count, entry.name.lower())))
+        for prefix, items in prefix_postings.items()
+    }
 
-    with _SHOPS_LOCK:
-        SHOPS_CACHE = shops
-        METRO_CACHE = metro_cache
-        STATIONS_CACHE = stations
-        STATION_SUMMARY_CACHE = tuple(station_summaries)
-        STATION_SUMMARY_BY_NAME = {summary.name: summary for summary in station_summaries}
-        STATION_SEARCH_INDEX = tuple(search_index)
-        AREA_SUMMARY_CACHE = area_summaries
-        AREA_SUMMARY_LIST = tuple(area_list)
-        SHOPS_CACHE_UPDATED_AT = datetime.now(timezone.utc)
+    return _ReferenceSnapshot(
+        shops=shops,
+        active_shops=MappingProxyType(
+            {shop_id: record for shop_id, record in shops.items() if record.is_active}
+        ),
+        metro_cache=metro_cache,
+        stations=stations,
+        station_summaries=tuple(station_summaries),
+        station_by_name={summary.name: summary for summary in station_summaries},
+        search_index=tuple(search_index),
+        ngram_index=ngram_index,
+        prefix_index=prefix_index,
+        area_summaries=area_summaries,
+        area_list=tuple(area_list),
+        updated_at=datetime.now(timezone.utc),
+    )
 
 
 def _should_refresh_cache() -> bool:
-    with _SHOPS_LOCK:
-        updated_at = SHOPS_CACHE_UPDATED_AT
-    if updated_at is None:
-        return True
-    age = (datetime.now(timezone.utc) - updated_at).total_seconds()
-    return age > CACHE_TTL_SECONDS
+    return time.monotonic() > _CACHE_DEADLINE
 
 
 def _ensure_cache_fresh() -> None:
-    if _should_refresh_cache():
-        _refresh_shops_cache_sync()
+    if not _should_refresh_cache():
+        return
+    with _SHOPS_LOCK:
+        # Пока ждали блокировку, справочник мог обновить другой поток.
+        if _should_refresh_cache():
+            _refresh_shops_cache_sync()
 
 
-def get_shops() -> Dict[int, ShopRecord]:
-    """Return cached shops mapping."""
+def get_shops() -> Mapping[int, ShopRecord]:
+    """Return a read-only view of the cached active shops."""
 
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return {
-            shop_id: record
-            for shop_id, record in SHOPS_CACHE.items()
-            if record.is_active
-        }
+    return _SNAPSHOT.active_shops
 
 
 def get_shop_name(shop_id: Optional[int]) -> Optional[str]:
@@ -635,50 +871,43 @@ def get_shop_name(shop_id: Optional[int]) -> Optional[str]:
         return None
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        record = SHOPS_CACHE.get(shop_id)
-        return record.name if record else None
+    record = _SNAPSHOT.shops.get(shop_id)
+    return record.name if record else None
 
 
 def get_station_names() -> Tuple[str, ...]:
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return STATIONS_CACHE
+    return _SNAPSHOT.stations
 
 
 def get_station_shops(station: str) -> Tuple[ShopLocation, ...]:
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return METRO_CACHE.get(station, tuple())
+    return _SNAPSHOT.metro_cache.get(station, tuple())
 
 
 def get_shops_updated_at() -> Optional[datetime]:
     _ensure_initialized()
-    with _SHOPS_LOCK:
-        return SHOPS_CACHE_UPDATED_AT
+    return _SNAPSHOT.updated_at
 
 
 def get_area_summaries() -> Tuple[AreaSummary, ...]:
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return AREA_SUMMARY_LIST
+    return _SNAPSHOT.area_list
 
 
 def get_area_summary(area_id: str) -> Optional[AreaSummary]:
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return AREA_SUMMARY_CACHE.get(area_id)
+    return _SNAPSHOT.area_summaries.get(area_id)
 
 
 def get_station_summary(station: str) -> Optional[StationSummary]:
     _ensure_initialized()
     _ensure_cache_fresh()
-    with _SHOPS_LOCK:
-        return STATION_SUMMARY_BY_NAME.get(station)
+    return _SNAPSHOT.station_by_name.get(station)
 
 
 def search_stations(query: str, *, limit: int) -> Tuple[StationSummary, ...]:
@@ -687,11 +916,37 @@ def search_stations(query: str, *, limit: int) -> Tuple[StationSummary, ...]:
     normalized = _normalize_station_for_search(query)
     if not normalized:
         return tuple()
+    snapshot = _SNAPSHOT
+    results_cache = snapshot.search_results
+    cache_key = (normalized, limit)
+    cached = results_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    result = _search_station_index(normalized, limit, snapshot)
+    if len(results_cache) >= SEARCH_RESULTS_CACHE_SIZE:
+        results_cache.clear()
+    results_cache[cache_key] = result
+    return result
+
+
+def _search_station_index(
+    normalized: str, limit: int, snapshot: _ReferenceSnapshot
+) -> Tuple[StationSummary, ...]:
+    index = snapshot.search_index
     matches: List[StationSummary] = []
     seen: set[str] = set()
-    with _SHOPS_LOCK:
-        index = STATION_SEARCH_INDEX
-    for normalized_name, summary in index:
+    for summary in snapshot.prefix_index.get(normalized, ())[:limit]:
+        if summary.name not in seen:
+            matches.append(summary)
+            seen.add(summary.name)
+    if len(matches) >= limit:
+        return tuple(matches)
+    candidates: Iterable[Tuple[str, StationSummary]] = index
+    if len(normalized) >= SEARCH_NGRAM_SIZE:
+        postings = [snapshot.ngram_index.get(ngram, ()) for ngram in _iter_ngrams(normalized)]
+        rarest = min(postings, key=len)
+        candidates = (index[position] for position in rarest)
+    for normalized_name, summary in candidates:
         if normalized in normalized_name and summary.name not in seen:
             matches.append(summary)
             seen.add(summary.name)
@@ -705,8 +960,14 @@ def _refresh_shops_cache_sync() -> None:
     _load_reference_cache()
 
 
+_refresh_task: Optional[asyncio.Future] = None
+
+
 async def refresh_shops_cache() -> None:
-    await asyncio.to_thread(_refresh_shops_cache_sync)
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_run_sheets_call(_refresh_shops_cache_sync))
+    await asyncio.shield(_refresh_task)
 
 
 def _next_request_id(ids: Iterable[str]) -> Tuple[int, int]:
@@ -721,14 +982,10 @@ def _next_request_id(ids: Iterable[str]) -> Tuple[int, int]:
     return max_id + 1, count + 1
 
 
-def _append_request_sync(payload: Dict[str, Any]) -> Tuple[int, int]:
-    _ensure_initialized()
-    now = datetime.now(timezone.utc).isoformat()
-    col_values = _requests_ws.col_values(REQUESTS_COLUMNS["id"])[1:]
-    request_id, row_number = _next_request_id(col_values)
+def _build_request_row(request_id: int, payload: Dict[str, Any], now: str) -> List[str]:
     picked_ids = payload.get("picked_ids") or []
     invited_ids = payload.get("invited_ids") or []
-    row = [
+    return [
         str(request_id),
         payload.get("kind", ""),
         payload.get("date", ""),
@@ -751,147 +1008,501 @@ def _append_request_sync(payload: Dict[str, Any]) -> Tuple[int, int]:
         str(payload.get("filled_slots") or 0),
         payload.get("end_dt_iso", ""),
     ]
-    _requests_ws.append_row(row, value_input_option="USER_ENTERED")
-    LOGGER.info("Appended request %s to Google Sheets", request_id)
-    return request_id, row_number + 1
+
+
+def _reserve_request_ids(count: int) -> Tuple[int, int]:
+    """Reserve ``count`` consecutive ids and return the first id and its row."""
+
+    global _NEXT_REQUEST_ID, _NEXT_REQUEST_ROW
+
+    with _REQUEST_COUNTER_LOCK:
+        if _NEXT_REQUEST_ID is None or _NEXT_REQUEST_ROW is None:
+            col_values = _requests_ws.col_values(_REQUESTS_ID_COL)[1:]
+            next_id, row_number = _next_request_id(col_values)
+            _NEXT_REQUEST_ID = next_id
+            _NEXT_REQUEST_ROW = row_number + 1
+        first_id, first_row = _NEXT_REQUEST_ID, _NEXT_REQUEST_ROW
+        _NEXT_REQUEST_ID += count
+        _NEXT_REQUEST_ROW += count
+        return first_id, first_row
+
+
+def _seed_request_counter(ids: List[str]) -> None:
+    global _NEXT_REQUEST_ID, _NEXT_REQUEST_ROW
+
+    with _REQUEST_COUNTER_LOCK:
+        if _NEXT_REQUEST_ID is None or _NEXT_REQUEST_ROW is None:
+            next_id, row_number = _next_request_id(ids)
+            _NEXT_REQUEST_ID = next_id
+            _NEXT_REQUEST_ROW = row_number + 1
+
+
+def _sync_next_request_row(next_row: int) -> None:
+    global _NEXT_REQUEST_ROW
+
+    with _REQUEST_COUNTER_LOCK:
+        if _NEXT_REQUEST_ROW is not None:
+            _NEXT_REQUEST_ROW = next_row
+
+
+def _appended_first_row(response: Any) -> Optional[int]:
+    """Return the first row written by append_rows, taken from the API response."""
+
+    if not isinstance(response, dict):
+        return None
+    updated_range = (response.get("updates") or {}).get("updatedRange") or ""
+    match = _UPDATED_RANGE_ROW_RE.search(updated_range)
+    return int(match.group(1)) if match else None
+
+
+def _load_request_index_sync() -> None:
+    _index_request_ids(_requests_ws.col_values(_REQUESTS_ID_COL)[1:])
+
+
+def _index_request_ids(ids: List[str]) -> None:
+    index: Dict[int, int] = {}
+    for row_number, value in enumerate(ids, start=2):
+        try:
+            index.setdefault(int(value), row_number)
+        except (TypeError, ValueError):
+            continue
+    with _ROW_INDEX_LOCK:
+        _REQUEST_ROW_INDEX.clear()
+        _REQUEST_ROW_INDEX.update(index)
+
+
+def _lookup_request_row(request_id: int, *, reload: bool = False) -> Optional[int]:
+    if not reload:
+        with _ROW_INDEX_LOCK:
+            row_number = _REQUEST_ROW_INDEX.get(request_id)
+        if row_number is not None:
+            return row_number
+    _load_request_index_sync()
+    with _ROW_INDEX_LOCK:
+        return _REQUEST_ROW_INDEX.get(request_id)
+
+
+def _read_request_row_sync(
+    request_id: int, end_column: str
+) -> Optional[Tuple[int, List[str]]]:
+    """Return the request's row number and its cells from column A to ``end_column``."""
+
+    row_number = _lookup_request_row(request_id)
+    if row_number is None:
+        return None
+    row_values = _get_row_sync(_requests_ws, row_number, end_column)
+    if not row_values or row_values[0].strip() != str(request_id):
+        # Строки в таблице сдвинули вручную: перечитываем индекс один раз.
+        row_number = _lookup_request_row(request_id, reload=True)
+        if row_number is None:
+            return None
+        row_values = _get_row_sync(_requests_ws, row_number, end_column)
+    return row_number, row_values
+
+
+def _reset_request_counter() -> None:
+    global _NEXT_REQUEST_ID, _NEXT_REQUEST_ROW
+
+    with _REQUEST_COUNTER_LOCK:
+        _NEXT_REQUEST_ID = None
+        _NEXT_REQUEST_ROW = None
+
+
+def _append_requests_sync(payloads: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    _ensure_initialized()
+    now = _utcnow_iso()
+    first_id, first_row = _reserve_request_ids(len(payloads))
+    rows = [
+        _build_request_row(first_id + offset, payload, now)
+        for offset, payload in enumerate(payloads)
+    ]
+    try:
+        response = _requests_ws.append_rows(rows, value_input_option="USER_ENTERED")
+    except Exception:
+        _reset_request_counter()
+        raise
+    appended_row = _appended_first_row(response)
+    if appended_row is not None:
+        first_row = appended_row
+        _sync_next_request_row(first_row + len(rows))
+    results = [(first_id + offset, first_row + offset) for offset in range(len(rows))]
+    if appended_row is not None:
+        with _ROW_INDEX_LOCK:
+            _REQUEST_ROW_INDEX.update(results)
+    LOGGER.info(
+        "Appended requests %s to Google Sheets",
+        ", ".join(str(request_id) for request_id, _ in results),
+    )
+    return results
+
+
+def _append_request_sync(payload: Dict[str, Any]) -> Tuple[int, int]:
+    return _append_requests_sync([payload])[0]
+
+
+SHEETS_CONCURRENCY = 8
+_sheets_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def _run_sheets_call(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking Sheets call in a thread, at most SHEETS_CONCURRENCY at once."""
+
+    global _sheets_semaphore
+    if _sheets_semaphore is None:
+        _sheets_semaphore = asyncio.Semaphore(SHEETS_CONCURRENCY)
+    async with _sheets_semaphore:
+        return await asyncio.to_thread(func, *args)
+
+
+REQUEST_APPEND_BATCH_SIZE = 50
+VALUES_WRITE_BATCH_SIZE = 32
+SHUTDOWN_DRAIN_TIMEOUT_SECONDS = 10.0
+_batch_queues: Dict[Callable[[List[Any]], List[Any]], asyncio.Queue] = {}
+_batch_workers: Dict[Callable[[List[Any]], List[Any]], asyncio.Task] = {}
+
+
+async def _batch_worker(
+    queue: asyncio.Queue, flush: Callable[[List[Any]], List[Any]], batch_size: int
+) -> None:
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        try:
+            results = await _run_sheets_call(flush, [item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+async def _submit_batched(
+    flush: Callable[[List[Any]], List[Any]], item: Any, batch_size: int
+) -> Any:
+    """Queue ``item`` for ``flush``; items queued meanwhile go out in one call.
+
+    ``flush`` may return an exception in place of a result to fail only that item.
+    """
+
+    queue = _batch_queues.get(flush)
+    if queue is None:
+        queue = _batch_queues[flush] = asyncio.Queue()
+    worker = _batch_workers.get(flush)
+    if worker is None or worker.done():
+        _batch_workers[flush] = asyncio.create_task(_batch_worker(queue, flush, batch_size))
+    future = asyncio.get_running_loop().create_future()
+    await queue.put((item, future))
+    return await future
+
+
+async def shutdown() -> None:
+    """Flush queued sheet writes and stop the batching workers."""
+
+    queues = list(_batch_queues.values())
+    if queues:
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in queues)),
+                SHUTDOWN_DRAIN_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            LOGGER.warning("Не все записи в Google Sheets успели отправиться до остановки")
+    workers = list(_batch_workers.values())
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    for queue in queues:
+        while not queue.empty():
+            _, future = queue.get_nowait()
+            future.cancel()
+    _batch_workers.clear()
+    _batch_queues.clear()
+
+
+def _write_values_sync(batches: List[List[Dict[str, Any]]]) -> List[Optional[Exception]]:
+    data = [entry for entries in batches for entry in entries]
+    try:
+        _spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": data})
+        return [None] * len(batches)
+    except Exception as exc:  # noqa: BLE001
+        if len(batches) == 1:
+            raise
+        LOGGER.warning("Пакетная запись не удалась, пишем по отдельности: %s", exc)
+    # batchUpdate атомарен: после отказа пишем каждый запрос отдельно,
+    # чтобы ошибка досталась только тому, чей диапазон её вызвал.
+    results: List[Optional[Exception]] = []
+    for entries in batches:
+        try:
+            _spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": entries})
+        except Exception as exc:  # noqa: BLE001
+            results.append(exc)
+        else:
+            results.append(None)
+    return results
+
+
+async def _write_values(data: List[Dict[str, Any]]) -> None:
+    await _submit_batched(_write_values_sync, data, VALUES_WRITE_BATCH_SIZE)
 
 
 async def gs_append_request(payload: Dict[str, Any]) -> Tuple[int, int]:
-    return await asyncio.to_thread(_append_request_sync, payload)
+    return await _submit_batched(_append_requests_sync, payload, REQUEST_APPEND_BATCH_SIZE)
 
 
-def _update_request_status_sync(
+def _request_status_updates_sync(
     request_id: int, status: str, channel_message_id: Optional[int]
-) -> None:
+) -> List[Dict[str, Any]]:
     _ensure_initialized()
-    try:
-        cell = _requests_ws.find(
-            str(request_id), in_column=REQUESTS_COLUMNS["id"]
-        )
-    except gspread.exceptions.CellNotFound:
+    found = _read_request_row_sync(request_id, "A")
+    if found is None:
         raise KeyError(f"Request {request_id} not found")
+    row_number = found[0]
 
-    updates = []
-    status_cell = rowcol_to_a1(cell.row, REQUESTS_COLUMNS["status"])
-    updates.append(
+    updated_at_cell = f"{_REQUESTS_UPDATED_AT_A1}{row_number}"
+    channel_cell = f"{_REQUESTS_CHANNEL_A1}{row_number}"
+    return [
         {
-            "range": status_cell,
+            "range": _sheet_range(REQUESTS_SHEET, f"{_REQUESTS_STATUS_A1}{row_number}"),
             "values": [[status]],
-        }
-    )
-    updated_at_cell = rowcol_to_a1(cell.row, REQUESTS_COLUMNS["updated_at"])
-    updates.append(
-        {
-            "range": updated_at_cell,
-            "values": [[datetime.now(timezone.utc).isoformat()]],
-        }
-    )
-    channel_cell = rowcol_to_a1(cell.row, REQUESTS_COLUMNS["channel_message_id"])
-    updates.append(
+        },
         {
-            "range": channel_cell,
-            "values": [["" if channel_message_id is None else str(channel_message_id)]],
-        }
-    )
-    _requests_ws.batch_update(updates)
-    LOGGER.info("Updated request %s status to %s", request_id, status)
+            "range": _sheet_range(REQUESTS_SHEET, f"{updated_at_cell}:{channel_cell}"),
+            "values": [
+                [
+                    _utcnow_iso(),
+                    "" if channel_message_id is None else str(channel_message_id),
+                ]
+            ],
+        },
+    ]
 
 
 async def gs_update_request_status(
     request_id: int, status: str, channel_message_id: Optional[int] = None
 ) -> None:
-    await asyncio.to_thread(_update_request_status_sync, request_id, status, channel_message_id)
+    updates = await _run_sheets_call(
+        _request_status_updates_sync, request_id, status, channel_message_id
+    )
+    # Сбрасываем кэш до и после записи: чтение, начатое до её окончания, не закэшируется.
+    _invalidate_cached_request(request_id)
+    try:
+        await _write_values(updates)
+    finally:
+        _invalidate_cached_request(request_id)
+    LOGGER.info("Updated request %s status to %s", request_id, status)
+
+
+def _get_cached_request(request_id: int) -> Optional[Dict[str, Any]]:
+    with _REQUEST_CACHE_LOCK:
+        entry = _REQUEST_CACHE.get(request_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _REQUEST_CACHE[request_id]
+            return None
+        _REQUEST_CACHE.move_to_end(request_id)
+    return copy.deepcopy(data)
+
+
+def _request_cache_generation() -> int:
+    with _REQUEST_CACHE_LOCK:
+        return _REQUEST_CACHE_GENERATION
+
+
+def _cache_request(request_id: int, data: Dict[str, Any], generation: int) -> None:
+    """Cache a row read that started at ``generation``; skip it if a write landed since."""
+
+    with _REQUEST_CACHE_LOCK:
+        if generation != _REQUEST_CACHE_GENERATION:
+            return
+        _REQUEST_CACHE[request_id] = (
+            time.monotonic() + REQUEST_CACHE_TTL_SECONDS,
+            copy.deepcopy(data),
+        )
+        _REQUEST_CACHE.move_to_end(request_id)
+        while len(_REQUEST_CACHE) > REQUEST_CACHE_SIZE:
+            _REQUEST_CACHE.popitem(last=False)
+
+
+def _invalidate_cached_request(request_id: int) -> None:
+    global _REQUEST_CACHE_GENERATION
+
+    with _REQUEST_CACHE_LOCK:
+        _REQUEST_CACHE.pop(request_id, None)
+        _REQUEST_CACHE_GENERATION += 1
 
 
 def _find_request_sync(request_id: int) -> Optional[Dict[str, Any]]:
+    cached = _get_cached_request(request_id)
+    if cached is not None:
+        return cached
     _ensure_initialized()
-    try:
-        cell = _requests_ws.find(
-            str(request_id), in_column=REQUESTS_COLUMNS["id"]
-        )
-    except gspread.exceptions.CellNotFound:
+    generation = _request_cache_generation()
+    found = _read_request_row_sync(request_id, _REQUESTS_END_COLUMN)
+    if found is None:
         return None
-    row_values = _requests_ws.row_values(cell.row)
-    row_map = {
-        header: row_values[index] if index < len(row_values) else ""
-        for index, header in enumerate(REQUESTS_HEADERS)
-    }
-    return _normalize_request_row(row_map)
+    row_values = found[1]
+    row_map = dict(zip(REQUESTS_HEADERS, _pad_row(row_values, len(REQUESTS_HEADERS))))
+    data = _normalize_request_row(row_map)
+    _cache_request(request_id, data, generation)
+    return data
 
 
 async def gs_find_request(request_id: int) -> Optional[Dict[str, Any]]:
-    return await asyncio.to_thread(_find_request_sync, request_id)
+    return await _run_sheets_call(_find_request_sync, request_id)
 
 
 def _list_requests_sync() -> List[Dict[str, Any]]:
     _ensure_initialized()
     try:
-        records = _requests_ws.get_all_records(expected_headers=REQUESTS_HEADERS)
+        values = _requests_ws.get_all_values()
     except Exception as exc:  # noqa: BLE001
         LOGGER.exception("Не удалось загрузить заявки: %s", exc)
         return []
-    return [_normalize_request_row(record) for record in records]
+    width = len(REQUESTS_HEADERS)
+    return [
+        _normalize_request_row(dict(zip(REQUESTS_HEADERS, _pad_row(row, width))))
+        for row in values[1:]
+    ]
 
 
 async def gs_list_requests() -> List[Dict[str, Any]]:
-    return await asyncio.to_thread(_list_requests_sync)
+    return await _run_sheets_call(_list_requests_sync)
 
 
-def _update_request_fields_sync(request_id: int, updates: Dict[str, Any]) -> None:
+def _request_fields_updates_sync(
+    request_id: int, updates: Dict[str, Any]
+) -> List[Dict[str, Any]]:
     _ensure_initialized()
-    try:
-        cell = _requests_ws.find(str(request_id), in_column=REQUESTS_COLUMNS["id"])
-    except gspread.exceptions.CellNotFound:
+    found = _read_request_row_sync(request_id, "A")
+    if found is None:
         raise KeyError(f"Request {request_id} not found")
+    row_number = found[0]
 
     prepared_updates = []
     for field, value in updates.items():
-        if field not in REQUESTS_COLUMNS:
+        column_letter = _REQUESTS_COLUMN_LETTERS.get(field)
+        if column_letter is None:
             continue
-        column_index = REQUESTS_COLUMNS[field]
-        cell_ref = rowcol_to_a1(cell.row, column_index)
+        cell_ref = f"{column_letter}{row_number}"
         if field in {"picked_ids", "invited_ids"}:
             if not isinstance(value, str):
                 value = json.dumps(value or [])
         elif value is None:
             value = ""
-        prepared_updates.append({"range": cell_ref, "values": [[str(value)]]})
+        prepared_updates.append(
+            {"range": _sheet_range(REQUESTS_SHEET, cell_ref), "values": [[str(value)]]}
+        )
 
     if not prepared_updates:
-        return
+        return []
 
-    updated_at_cell = rowcol_to_a1(cell.row, REQUESTS_COLUMNS["updated_at"])
+    updated_at_cell = f"{_REQUESTS_UPDATED_AT_A1}{row_number}"
     prepared_updates.append(
         {
-            "range": updated_at_cell,
-            "values": [[datetime.now(timezone.utc).isoformat()]],
+            "range": _sheet_range(REQUESTS_SHEET, updated_at_cell),
+            "values": [[_utcnow_iso()]],
         }
     )
-    _requests_ws.batch_update(prepared_updates)
-    LOGGER.debug("Updated request %s fields: %s", request_id, list(updates.keys()))
+    return prepared_updates
 
 
 async def gs_update_request_fields(request_id: int, updates: Dict[str, Any]) -> None:
-    await asyncio.to_thread(_update_request_fields_sync, request_id, updates)
+    prepared_updates = await _run_sheets_call(
+        _request_fields_updates_sync, request_id, updates
+    )
+    if not prepared_updates:
+        return
+    _invalidate_cached_request(request_id)
+    try:
+        await _write_values(prepared_updates)
+    finally:
+        _invalidate_cached_request(request_id)
+    LOGGER.debug("Updated request %s fields: %s", request_id, list(updates.keys()))
+
+
+def _load_users_index_sync() -> None:
+    _index_user_ids(_users_ws.col_values(USERS_COLUMNS["id"]))
+
+
+def _index_user_ids(ids: List[str]) -> None:
+    """Rebuild the user row index from the id column, header included."""
+
+    global _USERS_ROW_INDEX, _USERS_NEXT_ROW
+
+    with _USERS_LOCK:
+        index: Dict[str, int] = {}
+        for row_number, value in enumerate(ids[1:], start=2):
+            user_id = value.strip()
+            if user_id:
+                index.setdefault(user_id, row_number)
+        # Строки, выданные новым пользователям, но ещё не записанные, сохраняем.
+        for user_id, row_number in _USERS_ROW_INDEX.items():
+            if row_number > len(ids) and user_id not in index:
+                index[user_id] = row_number
+        _USERS_ROW_INDEX = index
+        _USERS_NEXT_ROW = max(_USERS_NEXT_ROW, len(ids) + 1)
+
+
+def _resolve_user_row_sync(user_id: str) -> Tuple[int, List[str], bool]:
+    """Return the user's sheet row, its cells and whether the row was just reserved."""
+
+    global _USERS_NEXT_ROW
+
+    found = _read_user_row_sync(user_id)
+    if found is not None:
+        return found[0], found[1], False
+    with _USERS_LOCK:
+        # Строка уже выдана параллельному вызову, но ещё не записана.
+        row_index = _USERS_ROW_INDEX.get(user_id)
+        if row_index is not None:
+            return row_index, [], False
+        row_index = _USERS_NEXT_ROW
+        _USERS_ROW_INDEX[user_id] = row_index
+        _USERS_NEXT_ROW += 1
+        return row_index, [], True
 
 
-def _ensure_user_sync(user: Dict[str, Any]) -> None:
+def _release_user_row(user_id: str, row_index: int) -> None:
+    """Forget a reserved row whose first write failed."""
+
+    global _USERS_NEXT_ROW
+
+    with _USERS_LOCK:
+        if _USERS_ROW_INDEX.get(user_id) == row_index:
+            del _USERS_ROW_INDEX[user_id]
+        if _USERS_NEXT_ROW == row_index + 1:
+            _USERS_NEXT_ROW = row_index
+
+
+def _user_row_update_sync(user: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[int]]:
+    """Build the user's row write; also return the row if it was reserved just now."""
+
     _ensure_initialized()
     if not user or "id" not in user:
         raise ValueError("User payload must include id")
     user_id = str(user.get("id"))
-    try:
-        cell = _users_ws.find(user_id)
-    except gspread.exceptions.CellNotFound:
-        cell = None
-    row_index = cell.row if cell else len(_users_ws.get_all_values()) + 1
-    existing_row: Dict[str, Any] = {}
-    if cell:
-        current_values = _users_ws.row_values(row_index)
-        existing_row = {
-            header: current_values[idx] if idx < len(current_values) else ""
-            for idx, header in enumerate(USERS_HEADERS)
-        }
+    row_index, current_values, reserved = _resolve_user_row_sync(user_id)
+    existing_row = dict(zip(USERS_HEADERS, _pad_row(current_values, len(USERS_HEADERS))))
     payload = {
         "id": user_id,
         "role": user.get("role", "worker"),
@@ -901,36 +1512,60 @@ def _ensure_user_sync(user: Dict[str, Any]) -> None:
         or "",
         "first_name": user.get("first_name") or "",
         "last_name": user.get("last_name") or "",
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": _utcnow_iso(),
     }
     row_values = [payload.get(header, "") for header in USERS_HEADERS]
-    end_column = _column_letter(len(USERS_HEADERS))
-    target_range = f"A{row_index}:{end_column}{row_index}"
-    _users_ws.batch_update([
-        {
-            "range": target_range,
-            "values": [row_values],
-        }
-    ])
-    LOGGER.debug("Ensured user %s in sheet", user_id)
+    target_range = f"A{row_index}:{_USERS_END_COLUMN}{row_index}"
+    update = {"range": _sheet_range(USERS_SHEET, target_range), "values": [row_values]}
+    return update, row_index if reserved else None
 
 
 async def gs_ensure_user(user: Dict[str, Any]) -> None:
-    await asyncio.to_thread(_ensure_user_sync, user)
+    update, reserved_row = await _run_sheets_call(_user_row_update_sync, user)
+    try:
+        await _write_values([update])
+    except Exception:
+        if reserved_row is not None:
+            _release_user_row(str(user.get("id")), reserved_row)
+        raise
+    LOGGER.debug("Ensured user %s in sheet", user.get("id"))
+
+
+def _read_user_row_sync(user_id: str) -> Optional[Tuple[int, List[str]]]:
+    """Return the user's row number and cells, checked against the id in column A."""
+
+    # Индекс перечитываем без _USERS_LOCK: блокировка берётся только на подмену
+    # словаря в _index_user_ids и на повторный поиск после неё.
+    with _USERS_LOCK:
+        row_index = _USERS_ROW_INDEX.get(user_id)
+    if row_index is None:
+        _load_users_index_sync()
+        with _USERS_LOCK:
+            row_index = _USERS_ROW_INDEX.get(user_id)
+    if row_index is None:
+        return None
+    row_values = _get_row_sync(_users_ws, row_index, _USERS_END_COLUMN)
+    if row_values and row_values[0].strip() == user_id:
+        return row_index, row_values
+    # Строки в таблице сдвинули вручную: перечитываем индекс один раз.
+    _load_users_index_sync()
+    with _USERS_LOCK:
+        row_index = _USERS_ROW_INDEX.get(user_id)
+    if row_index is None:
+        return None
+    row_values = _get_row_sync(_users_ws, row_index, _USERS_END_COLUMN)
+    if row_values and row_values[0].strip() == user_id:
+        return row_index, row_values
+    return None
 
 
 def _get_user_sync(user_id: int) -> Optional[Dict[str, Any]]:
     _ensure_initialized()
-    try:
-        cell = _users_ws.find(str(user_id))
-    except gspread.exceptions.CellNotFound:
-        return None
-    if cell is None:
+    found = _read_user_row_sync(str(user_id))
+    if found is None:
         return None
-    row_values = _users_ws.row_values(cell.row)
-    data: Dict[str, Any] = {}
-    for index, header in enumerate(USERS_HEADERS):
-        data[header] = row_values[index] if index < len(row_values) else ""
+    row_values = found[1]
+    data: Dict[str, Any] = dict(zip(USERS_HEADERS, _pad_row(row_values, len(USERS_HEADERS))))
     if data.get("id"):
         try:
             data["id"] = int(data["id"])
@@ -944,7 +1579,7 @@ def _get_user_sync(user_id: int) -> Optional[Dict[str, Any]]:
 
 
 async def gs_get_user(user_id: int) -> Optional[Dict[str, Any]]:
-    return await asyncio.to_thread(_get_user_sync, user_id)
+    return await _run_sheets_call(_get_user_sync, user_id)
 
 
 __all__ = [
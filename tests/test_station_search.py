@@ -0,0 +1,76 @@
+"""Unit tests for the in-memory station search index."""
+
+import unittest
+
+import storage
+
+SHOP_ROWS = [
+    storage.SHOPS_HEADERS,
+    ["1", "Лавка 1", "1", "Киевская", "100", "Кузнецкий Мост", "200", "Китай-город", "300"],
+    ["2", "Лавка 2", "1", "Киевская", "150", "Кузнецкий Мост", "250"],
+    ["3", "Лавка 3", "1", "Киевская", "400", "Парк Культуры", "500"],
+    ["4", "Лавка 4", "1", "Новокузнецкая", "100", "Щёлковская", "900"],
+]
+METRO_ROWS = [storage.METRO_AREAS_HEADERS]
+
+
+def search(snapshot: storage._ReferenceSnapshot, query: str, limit: int = 10) -> list:
+    normalized = storage._normalize_station_for_search(query)
+    return [summary.name for summary in storage._search_station_index(normalized, limit, snapshot)]
+
+
+class NormalizeStationTests(unittest.TestCase):
+    def test_lowercases_and_strips_separators(self) -> None:
+        self.assertEqual(storage._normalize_station_for_search("Китай-город"), "китайгород")
+        self.assertEqual(
+            storage._normalize_station_for_search("  Парк (Культуры) "), "парккультуры"
+        )
+        self.assertEqual(storage._normalize_station_for_search("«Кузнецкий_Мост»"), "кузнецкиймост")
+
+    def test_folds_yo_into_ye(self) -> None:
+        self.assertEqual(storage._normalize_station_for_search("Щёлковская"), "щелковская")
+
+    def test_empty_value(self) -> None:
+        self.assertEqual(storage._normalize_station_for_search(""), "")
+
+
+class SearchStationIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.snapshot = storage._build_reference_snapshot(SHOP_ROWS, METRO_ROWS)
+
+    def test_prefix_matches_come_first_by_shop_count(self) -> None:
+        self.assertEqual(
+            search(self.snapshot, "К"),
+            [
+                "Киевская",
+                "Кузнецкий Мост",
+                "Китай-город",
+                "Новокузнецкая",
+                "Парк Культуры",
+                "Щёлковская",
+            ],
+        )
+
+    def test_two_letter_query_fills_with_substring_matches(self) -> None:
+        self.assertEqual(
+            search(self.snapshot, "ки"), ["Киевская", "Китай-город", "Кузнецкий Мост"]
+        )
+
+    def test_limit_cuts_prefix_matches(self) -> None:
+        self.assertEqual(search(self.snapshot, "ки", limit=1), ["Киевская"])
+
+    def test_trigram_candidates_follow_prefix_matches(self) -> None:
+        self.assertEqual(search(self.snapshot, "кузнец"), ["Кузнецкий Мост", "Новокузнецкая"])
+
+    def test_query_matches_without_separators_and_yo(self) -> None:
+        self.assertEqual(search(self.snapshot, "китай город"), ["Китай-город"])
+        self.assertEqual(search(self.snapshot, "щелк"), ["Щёлковская"])
+
+    def test_trigram_without_postings_returns_nothing(self) -> None:
+        self.assertEqual(search(self.snapshot, "xyz"), [])
+        self.assertEqual(search(self.snapshot, "кузнецxyz"), [])
+
+
+if __name__ == "__main__":  # pragma: no cover - convenience entry point
+    unittest.main()
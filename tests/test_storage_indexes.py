@@ -0,0 +1,234 @@
+"""Unit tests for the in-memory row and id indexes over the Sheets tables."""
+
+import re
+import threading
+import unittest
+from collections import OrderedDict
+from typing import Any, Dict, List
+from unittest import mock
+
+import storage
+
+
+class FakeWorksheet:
+    """Minimal stand-in for gspread.Worksheet covering the calls the indexes make."""
+
+    def __init__(self, rows: List[List[str]]) -> None:
+        self.rows = [list(row) for row in rows]
+        self.col_values_calls = 0
+
+    def col_values(self, column: int) -> List[str]:
+        self.col_values_calls += 1
+        values = [row[column - 1] if len(row) >= column else "" for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, range_name: str) -> List[List[str]]:
+        row_number = int(re.match(r"[A-Z]+(\d+)", range_name).group(1))
+        if row_number > len(self.rows) or not self.rows[row_number - 1]:
+            return []
+        return [list(self.rows[row_number - 1])]
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        initialized = threading.Event()
+        initialized.set()
+        self.users_ws = FakeWorksheet([storage.USERS_HEADERS])
+        self.requests_ws = FakeWorksheet([storage.REQUESTS_HEADERS])
+        patches: Dict[str, Any] = {
+            "_INITIALIZED": initialized,
+            "_users_ws": self.users_ws,
+            "_requests_ws": self.requests_ws,
+            "_USERS_ROW_INDEX": {},
+            "_USERS_NEXT_ROW": 0,
+            "_REQUEST_ROW_INDEX": {},
+            "_NEXT_REQUEST_ID": None,
+            "_NEXT_REQUEST_ROW": None,
+            "_REQUEST_CACHE": OrderedDict(),
+            "_REQUEST_CACHE_GENERATION": 0,
+        }
+        for name, value in patches.items():
+            patcher = mock.patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class UsersIndexTests(IndexTestCase):
+    def test_index_skips_blank_ids_and_points_past_the_data(self) -> None:
+        storage._index_user_ids(["id", "1", "", "3"])
+        self.assertEqual(storage._USERS_ROW_INDEX, {"1": 2, "3": 4})
+        self.assertEqual(storage._USERS_NEXT_ROW, 5)
+
+    def test_reservation_survives_reload_without_duplicate_rows(self) -> None:
+        self.users_ws.rows += [["1"], ["2"]]
+        storage._load_users_index_sync()
+
+        self.assertEqual(storage._resolve_user_row_sync("9"), (4, [], True))
+        storage._load_users_index_sync()
+        self.assertEqual(storage._USERS_ROW_INDEX["9"], 4)
+        self.assertEqual(storage._resolve_user_row_sync("9"), (4, [], False))
+        self.assertEqual(storage._resolve_user_row_sync("10"), (5, [], True))
+
+    def test_reload_prefers_sheet_rows_over_stale_entries(self) -> None:
+        storage._USERS_ROW_INDEX["9"] = 7
+        storage._index_user_ids(["id", "1", "9"])
+        self.assertEqual(storage._USERS_ROW_INDEX, {"1": 2, "9": 3})
+
+    def test_release_forgets_reservation_and_rewinds_next_row(self) -> None:
+        storage._index_user_ids(["id", "1"])
+        row_index, _, reserved = storage._resolve_user_row_sync("9")
+        self.assertTrue(reserved)
+        storage._release_user_row("9", row_index)
+        self.assertNotIn("9", storage._USERS_ROW_INDEX)
+        self.assertEqual(storage._USERS_NEXT_ROW, row_index)
+
+    def test_get_user_follows_a_moved_row(self) -> None:
+        self.users_ws.rows += [["1", "worker"], ["2", "director", "boss", "+7"]]
+        storage._load_users_index_sync()
+        self.users_ws.rows.insert(1, ["5", "worker"])
+
+        user = storage._get_user_sync(2)
+        self.assertEqual(user["id"], 2)
+        self.assertEqual(user["phone_number"], "+7")
+        self.assertEqual(storage._USERS_ROW_INDEX["2"], 4)
+
+    def test_get_user_returns_none_for_removed_user(self) -> None:
+        self.users_ws.rows += [["1"], ["2"]]
+        storage._load_users_index_sync()
+        del self.users_ws.rows[2]
+        self.assertIsNone(storage._get_user_sync(2))
+
+    def test_index_reload_does_not_hold_the_users_lock(self) -> None:
+        self.users_ws.rows += [["1"], ["2"]]
+        lock_free: List[bool] = []
+        col_values = self.users_ws.col_values
+
+        def checked_col_values(column: int) -> List[str]:
+            def try_lock() -> None:
+                acquired = storage._USERS_LOCK.acquire(timeout=1)
+                lock_free.append(acquired)
+                if acquired:
+                    storage._USERS_LOCK.release()
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return col_values(column)
+
+        self.users_ws.col_values = checked_col_values
+        self.assertEqual(storage._read_user_row_sync("2"), (3, ["2"]))
+        self.assertEqual(lock_free, [True])
+
+    def test_upsert_writes_to_the_moved_row_and_keeps_contact(self) -> None:
+        self.users_ws.rows += [["1", "worker"], ["2", "director", "boss", "+7"]]
+        storage._load_users_index_sync()
+        self.users_ws.rows.insert(1, ["5", "worker"])
+
+        update, reserved_row = storage._user_row_update_sync({"id": 2, "role": "director"})
+        self.assertEqual(update["range"], "'Users'!A4:G4")
+        self.assertEqual(update["values"][0][:4], ["2", "director", "boss", "+7"])
+        self.assertIsNone(reserved_row)
+
+
+class RequestCounterTests(IndexTestCase):
+    def test_seed_sets_next_id_and_row_once(self) -> None:
+        storage._seed_request_counter(["1", "x", "5"])
+        self.assertEqual(storage._reserve_request_ids(2), (6, 5))
+        storage._seed_request_counter(["1"])
+        self.assertEqual(storage._reserve_request_ids(1), (8, 7))
+
+    def test_reserve_reads_id_column_lazily(self) -> None:
+        self.requests_ws.rows += [["3"], ["4"]]
+        self.assertEqual(storage._reserve_request_ids(1), (5, 4))
+        self.assertEqual(storage._reserve_request_ids(1), (6, 5))
+        self.assertEqual(self.requests_ws.col_values_calls, 1)
+
+    def test_appended_first_row(self) -> None:
+        response = {"updates": {"updatedRange": "'Requests'!A10:U12"}}
+        self.assertEqual(storage._appended_first_row(response), 10)
+        self.assertEqual(
+            storage._appended_first_row({"updates": {"updatedRange": "Requests!A7"}}), 7
+        )
+        self.assertIsNone(storage._appended_first_row({}))
+        self.assertIsNone(storage._appended_first_row(None))
+
+
+class RequestRowIndexTests(IndexTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.requests_ws.rows += [["7", "director"], ["9", "worker"]]
+        storage._load_request_index_sync()
+
+    def test_read_follows_a_moved_row(self) -> None:
+        del self.requests_ws.rows[1]
+        row_number, values = storage._read_request_row_sync(9, storage._REQUESTS_END_COLUMN)
+        self.assertEqual(row_number, 2)
+        self.assertEqual(values[:2], ["9", "worker"])
+
+    def test_status_update_targets_the_moved_row(self) -> None:
+        self.requests_ws.rows.insert(1, ["3", "worker"])
+        updates = storage._request_status_updates_sync(9, "closed", None)
+        self.assertEqual(updates[0]["range"], f"'Requests'!{storage._REQUESTS_STATUS_A1}4")
+
+    def test_find_caches_row_until_invalidated(self) -> None:
+        self.assertEqual(storage._find_request_sync(9)["id"], 9)
+        self.requests_ws.rows[2][1] = "director"
+        self.assertEqual(storage._find_request_sync(9)["kind"], "worker")
+        storage._invalidate_cached_request(9)
+        self.assertEqual(storage._find_request_sync(9)["kind"], "director")
+
+    def test_read_overlapping_a_write_is_not_cached(self) -> None:
+        generation = storage._request_cache_generation()
+        storage._invalidate_cached_request(9)
+        storage._cache_request(9, {"id": 9, "kind": "stale"}, generation)
+        self.assertIsNone(storage._get_cached_request(9))
+
+    def test_field_update_raises_for_removed_request(self) -> None:
+        del self.requests_ws.rows[1]
+        with self.assertRaises(KeyError):
+            storage._request_fields_updates_sync(7, {"note": "x"})
+
+
+class FakeSpreadsheet:
+    """Stand-in for gspread.Spreadsheet that rejects writes touching a bad range."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def values_batch_update(self, body: Dict[str, Any]) -> None:
+        ranges = [entry["range"] for entry in body["data"]]
+        self.calls.append(ranges)
+        if "bad" in ranges:
+            raise ValueError("bad range")
+
+
+class WriteValuesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.spreadsheet = FakeSpreadsheet()
+        patcher = mock.patch.object(storage, "_spreadsheet", self.spreadsheet)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batches_go_out_in_one_call(self) -> None:
+        results = storage._write_values_sync([[{"range": "a"}], [{"range": "b"}]])
+        self.assertEqual(results, [None, None])
+        self.assertEqual(self.spreadsheet.calls, [["a", "b"]])
+
+    def test_failed_batch_is_retried_per_caller(self) -> None:
+        results = storage._write_values_sync(
+            [[{"range": "a"}], [{"range": "bad"}], [{"range": "c"}]]
+        )
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsNone(results[2])
+        self.assertEqual(self.spreadsheet.calls[1:], [["a"], ["bad"], ["c"]])
+
+    def test_single_caller_failure_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            storage._write_values_sync([[{"range": "bad"}]])
+
+
+if __name__ == "__main__":  # pragma: no cover - convenience entry point
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Unit test for the Sheets client construction in storage initialization."""
+
+import threading
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.credentials import Credentials
+
+import storage
+
+SHEETS: Dict[str, List[List[str]]] = {
+    storage.REQUESTS_SHEET: [storage.REQUESTS_HEADERS, ["4", "director"]],
+    storage.USERS_SHEET: [storage.USERS_HEADERS, ["42", "worker"]],
+    storage.SHOPS_SHEET: [storage.SHOPS_HEADERS, ["1", "Лавка", "1", "Киевская", "100"]],
+    storage.METRO_AREAS_SHEET: [storage.METRO_AREAS_HEADERS, ["Киевская", "WEST", ""]],
+}
+
+
+def fake_response(body: Dict[str, Any]) -> mock.Mock:
+    return mock.Mock(ok=True, status_code=200, json=mock.Mock(return_value=body))
+
+
+def fake_session_request(
+    self: AuthorizedSession, method: str, url: str, params: Any = None, **kwargs: Any
+) -> mock.Mock:
+    if url.endswith("values:batchGet"):
+        value_ranges = []
+        for range_name in params["ranges"]:
+            title, cells = range_name.split("!")
+            rows = SHEETS[title.strip("'")]
+            if cells == "1:1":
+                values = rows[:1]
+            elif cells == "A:A":
+                values = [row[:1] for row in rows]
+            else:
+                values = rows
+            value_ranges.append({"range": range_name, "values": values})
+        return fake_response({"valueRanges": value_ranges})
+    sheets = [
+        {"properties": {"title": title, "sheetId": index, "index": index}}
+        for index, title in enumerate(SHEETS)
+    ]
+    return fake_response({"properties": {"title": "Test"}, "sheets": sheets})
+
+
+class InitializeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        patches: Dict[str, Any] = {
+            "SPREADSHEET_ID": "spreadsheet",
+            "_INITIALIZED": threading.Event(),
+            "_client": None,
+            "_spreadsheet": None,
+            "_requests_ws": None,
+            "_users_ws": None,
+            "_shops_ws": None,
+            "_metro_areas_ws": None,
+            "_SNAPSHOT": storage._ReferenceSnapshot(),
+            "_CACHE_DEADLINE": 0.0,
+            "_REFERENCE_DIGEST": None,
+            "_USERS_ROW_INDEX": {},
+            "_USERS_NEXT_ROW": 0,
+            "_REQUEST_ROW_INDEX": {},
+            "_NEXT_REQUEST_ID": None,
+            "_NEXT_REQUEST_ROW": None,
+        }
+        for name, value in patches.items():
+            patcher = mock.patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for patcher in (
+            mock.patch.object(storage, "_decode_service_account", return_value={}),
+            mock.patch.object(
+                storage.Credentials,
+                "from_service_account_info",
+                return_value=Credentials(token="token"),
+            ),
+            mock.patch.object(AuthorizedSession, "request", fake_session_request),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_client_uses_pooled_session_with_retries(self) -> None:
+        storage._ensure_initialized()
+
+        session = storage._client.http_client.session
+        self.assertIsInstance(session, AuthorizedSession)
+        retry = session.get_adapter("https://sheets.googleapis.com").max_retries
+        self.assertIn(429, retry.status_forcelist)
+        self.assertFalse(retry.raise_on_status)
+
+        self.assertEqual(storage._requests_ws.title, storage.REQUESTS_SHEET)
+        self.assertEqual(storage._REQUEST_ROW_INDEX, {4: 2})
+        self.assertEqual(storage._USERS_ROW_INDEX, {"42": 2})
+        self.assertEqual(list(storage.get_shops()), [1])
+
+
+if __name__ == "__main__":  # pragma: no cover - convenience entry point
+    unittest.main()